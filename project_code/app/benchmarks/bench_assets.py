@@ -0,0 +1,46 @@
+"""
+Measure per-sentence asset generation against offline providers.
+
+Run from project_code/app:
+
+    python -m benchmarks.bench_assets --sentences 20 --latency 0.5
+
+Each provider call sleeps for --latency seconds, so with N sentences the
+serial pipeline takes roughly 2 * N * latency and the speedup grows close to
+linearly with the concurrency limit.
+"""
+
+import time
+import argparse
+
+from benchmarks.fakes import offline_workspace
+
+
+def run(sentences: int, latency: float, concurrency: int) -> float:
+    from storyboard.models import RenderSettings
+    from storyboard.services import generate_sentence_assets
+
+    story = [f"Sentence number {i} of the benchmark story." for i in range(sentences)]
+    with offline_workspace(latency) as workdir:
+        start = time.perf_counter()
+        generate_sentence_assets(story, RenderSettings(), workdir, concurrency)
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sentences", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    baseline = None
+    print(f"{'concurrency':>11}  {'seconds':>8}  {'speedup':>7}")
+    for concurrency in args.concurrency:
+        elapsed = run(args.sentences, args.latency, concurrency)
+        baseline = baseline or elapsed
+        print(f"{concurrency:>11}  {elapsed:>8.2f}  {baseline / elapsed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Measure storyboard render throughput against the number of farm workers.
+
+Run from project_code/app:
+
+    python -m benchmarks.bench_farm --stories 8 --sentences 12 --workers 1 2 4 8
+
+Every run renders the same set of distinct stories from a cold cache with the
+offline provider stand-ins, so the numbers reflect scene building and
+encoding only. Workers of 0 selects the serial backend.
+"""
+
+import time
+import argparse
+
+from benchmarks.fakes import offline_workspace
+
+
+def run(stories: int, sentences: int, workers: int) -> float:
+    """Render the stories and return throughput in videos per minute."""
+    from storyboard import render_farm
+    from storyboard.services import render_storyboard
+
+    if workers:
+        render_farm.configure(backend="parallel", workers=workers)
+    else:
+        render_farm.configure(backend="serial")
+    texts = [
+        ". ".join(f"Story {s} scene {i} shows the product in use" for i in range(sentences)) + "."
+        for s in range(stories)
+    ]
+    try:
+        with offline_workspace():
+            start = time.perf_counter()
+            for text in texts:
+                render_storyboard(text)
+            elapsed = time.perf_counter() - start
+    finally:
+        render_farm.shutdown()
+    return 60 * stories / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--stories", type=int, default=8)
+    parser.add_argument("--sentences", type=int, default=12)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4, 8])
+    args = parser.parse_args()
+
+    print(f"{'workers':>7}  {'videos/min':>10}")
+    for workers in args.workers:
+        throughput = run(args.stories, args.sentences, workers)
+        print(f"{workers or 'serial':>7}  {throughput:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Benchmark the whole render pipeline offline across story lengths.
+
+Run from project_code/app:
+
+    python -m benchmarks.bench_render --sentences 1 10 50 100 200
+    python -m benchmarks.bench_render --compare benchmarks/results/<earlier run>.json
+
+Every story length renders a deterministic story through
+generate_storyboard_video in a fresh process, with the offline provider
+stand-ins and cold caches. Each run records end-to-end time, time per
+pipeline stage (from utils.metrics), peak memory of the render process and
+of its ffmpeg children, and the size of the output video. Results are
+written as JSON to benchmarks/results/, tagged with the current commit, so
+runs from different commits can be compared with --compare.
+
+Stage timings only cover work done in the render process; scenes encoded by
+the parallel farm backend are timed inside its worker processes and are
+missing from the breakdown.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import datetime
+import subprocess
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+WORDS = ["bright", "quiet", "morning", "city", "river", "market", "product", "family", "journey", "garden"]
+
+
+def story(sentences: int) -> str:
+    """Build a deterministic story whose sentences are all distinct."""
+    return " ".join(
+        f"Scene {i} shows a {WORDS[i % len(WORDS)]} {WORDS[(i * 7 + 3) % len(WORDS)]} with the product in use."
+        for i in range(sentences)
+    )
+
+
+def _commit() -> str:
+    """Return the current commit, marked dirty if the tree has local changes."""
+    try:
+        sha = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], check=True, capture_output=True, text=True
+        ).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain"], capture_output=True, text=True).stdout.strip()
+        return sha + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def worker(sentences: int, latency: float, encoder: str, backend: str) -> dict:
+    """Render one story in this process and report its measurements."""
+    # Settings are read at import time, so they are set before the pipeline is loaded
+    os.environ["RENDER_ENCODER"] = encoder
+    os.environ["RENDER_BACKEND"] = backend
+
+    from benchmarks.fakes import offline_workspace
+    from storyboard import render_farm
+    from storyboard.services import generate_storyboard_video
+    from utils.metrics import metrics
+
+    try:
+        with offline_workspace(latency):
+            start = time.perf_counter()
+            video = generate_storyboard_video(story(sentences))
+            elapsed = time.perf_counter() - start
+            size = os.path.getsize(video)
+    finally:
+        render_farm.shutdown()
+
+    stages = {
+        entry["labels"]["stage"]: {"count": entry["count"], "seconds": round(entry["seconds"], 4)}
+        for entry in metrics.summary("render_stage_seconds")
+    }
+    return {
+        "sentences": sentences,
+        "seconds": round(elapsed, 4),
+        "seconds_per_sentence": round(elapsed / sentences, 4),
+        "stages": stages,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "peak_child_rss_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+        "output_bytes": size,
+    }
+
+
+def run(sentences: int, latency: float, encoder: str, backend: str) -> dict:
+    """Run worker() in a fresh interpreter so memory and caches start clean."""
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_render", "--worker", str(sentences),
+         "--latency", str(latency), "--encoder", encoder, "--backend", backend],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def compare(baseline_path: str, results: dict) -> None:
+    """Print the change in time, memory and size against an earlier results file."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    earlier = {entry["sentences"]: entry for entry in baseline["runs"]}
+    print(f"\nagainst {baseline['commit']} ({baseline_path})")
+    print(f"{'sentences':>9}  {'seconds':>14}  {'peak MB':>14}  {'bytes':>16}")
+    for entry in results["runs"]:
+        before = earlier.get(entry["sentences"])
+        if before is None:
+            continue
+
+        def delta(field):
+            if not before[field]:
+                return "n/a"
+            return f"{100 * (entry[field] - before[field]) / before[field]:+.1f}%"
+
+        print(f"{entry['sentences']:>9}  {delta('seconds'):>14}  {delta('peak_rss_mb'):>14}  {delta('output_bytes'):>16}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sentences", type=int, nargs="+", default=[1, 10, 50, 100, 200])
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds each provider call sleeps")
+    parser.add_argument("--encoder", default="still", choices=["still", "moviepy"])
+    parser.add_argument("--backend", default="serial", choices=["serial", "parallel"])
+    parser.add_argument("--output", help="results file, defaults to benchmarks/results/render_<commit>_<time>.json")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(worker(args.worker, args.latency, args.encoder, args.backend)))
+        return
+
+    commit = _commit()
+    results = {
+        "commit": commit,
+        "created_on": datetime.datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": {"latency": args.latency, "encoder": args.encoder, "backend": args.backend},
+        "runs": [],
+    }
+    print(f"{'sentences':>9}  {'seconds':>8}  {'s/sentence':>10}  {'peak MB':>8}  {'ffmpeg MB':>9}  {'output KB':>9}")
+    for sentences in args.sentences:
+        entry = run(sentences, args.latency, args.encoder, args.backend)
+        results["runs"].append(entry)
+        print(
+            f"{sentences:>9}  {entry['seconds']:>8.2f}  {entry['seconds_per_sentence']:>10.3f}  "
+            f"{entry['peak_rss_mb']:>8.1f}  {entry['peak_child_rss_mb']:>9.1f}  {entry['output_bytes'] / 1024:>9.0f}"
+        )
+        stages = sorted(entry["stages"].items(), key=lambda item: -item[1]["seconds"])
+        print("           " + ", ".join(f"{name} {stage['seconds']:.2f}s" for name, stage in stages))
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"render_{commit}_{datetime.datetime.utcnow():%Y%m%dT%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nresults written to {output}")
+
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Compare per-frame cost and peak memory of the scene timeline as stories grow.
+
+Run from project_code/app:
+
+    python -m benchmarks.bench_timeline --sentences 10 50 150 300
+
+Each story length runs in a fresh process so peak RSS is measured per run.
+"sequential" is storyboard.timeline.SequentialTimeline; "composite" is the
+previous CompositeVideoClip over every scene offset with set_start.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+
+FPS = 24
+SIZE = (512, 512)
+SCENE_SECONDS = 2.0
+
+
+def _build(mode: str, sentences: int, workdir: str):
+    from benchmarks.fakes import make_image
+    from storyboard.render_farm import scene_frame
+    from storyboard.timeline import SequentialTimeline
+
+    images = []
+    for i in range(sentences):
+        path = os.path.join(workdir, f"background_{i}.png")
+        with open(path, "wb") as f:
+            f.write(make_image(f"scene {i}", SIZE))
+        images.append(path)
+    texts = [f"Scene {i} of the benchmark story." for i in range(sentences)]
+    durations = [SCENE_SECONDS] * sentences
+
+    if mode == "sequential":
+        scenes = [lambda i=i: scene_frame(images[i], texts[i], SIZE) for i in range(sentences)]
+        return SequentialTimeline(scenes, durations, SIZE).clip()
+
+    from moviepy.editor import CompositeVideoClip, ImageClip
+    from storyboard.imaging import background_frame, render_caption
+
+    clips = []
+    for i in range(sentences):
+        bg_clip = ImageClip(background_frame(images[i], SIZE), duration=SCENE_SECONDS)
+        text_clip = ImageClip(render_caption(texts[i], SIZE), transparent=True).set_duration(SCENE_SECONDS)
+        clips.append(CompositeVideoClip([bg_clip, text_clip]).set_start(i * SCENE_SECONDS))
+    return CompositeVideoClip(clips, size=SIZE)
+
+
+def worker(mode: str, sentences: int, samples: int) -> dict:
+    """Build one timeline and time frame lookups across its whole length."""
+    with tempfile.TemporaryDirectory() as workdir:
+        clip = _build(mode, sentences, workdir)
+        times = [clip.duration * k / samples for k in range(samples)]
+        start = time.perf_counter()
+        for t in times:
+            clip.get_frame(t)
+        elapsed = time.perf_counter() - start
+    return {
+        "mode": mode,
+        "sentences": sentences,
+        "frames": samples,
+        "ms_per_frame": 1000 * elapsed / samples,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sentences", type=int, nargs="+", default=[10, 50, 150, 300])
+    parser.add_argument("--modes", nargs="+", default=["sequential", "composite"])
+    parser.add_argument("--samples", type=int, default=480)
+    parser.add_argument("--worker", nargs=2, metavar=("MODE", "SENTENCES"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(worker(args.worker[0], int(args.worker[1]), args.samples)))
+        return
+
+    print(f"{'mode':>10}  {'sentences':>9}  {'ms/frame':>8}  {'peak MB':>8}")
+    for mode in args.modes:
+        for sentences in args.sentences:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_timeline", "--samples", str(args.samples),
+                 "--worker", mode, str(sentences)],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{mode:>10}  {sentences:>9}  {result['ms_per_frame']:>8.2f}  {result['peak_rss_mb']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
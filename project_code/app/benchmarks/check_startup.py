@@ -0,0 +1,90 @@
+"""
+Check that the API process starts quickly and without the render dependencies.
+
+Run from project_code/app, e.g. in CI:
+
+    python -m benchmarks.check_startup --max-seconds 1.5 --max-rss-mb 150
+
+main is imported in a fresh interpreter. The check fails, exiting 1, if any
+render or model package was loaded (the import chain that pulled it in is
+printed), or if the import time or resident memory exceeds its budget.
+Render dependencies belong in storyboard.services and the modules it
+imports, which are only loaded when a render actually runs.
+"""
+
+import sys
+import json
+import argparse
+import subprocess
+
+# Packages the API process must not import at startup
+HEAVY_PACKAGES = [
+    "moviepy", "imageio", "imageio_ffmpeg", "numpy", "PIL", "proglog", "openai", "gtts",
+    "torch", "transformers", "spacy", "sentence_transformers",
+]
+
+# Runs in the child: records who imports a heavy package first, then imports main
+CHILD = """
+import sys, json, time, resource, traceback
+
+heavy = set(json.loads(sys.argv[1]))
+chains = {}
+
+class Watch:
+    def find_spec(self, name, path=None, target=None):
+        top = name.split(".")[0]
+        if top in heavy and top not in chains:
+            frames = [f for f in traceback.extract_stack() if "importlib" not in f.filename]
+            chains[top] = [f"{f.filename}:{f.lineno}" for f in frames[-6:-1]]
+        return None
+
+sys.meta_path.insert(0, Watch())
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "seconds": elapsed,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "modules": len(sys.modules),
+    "heavy": {name: chains.get(name, []) for name in heavy if name in sys.modules},
+}))
+"""
+
+
+def measure() -> dict:
+    """Import main in a fresh interpreter and return its measurements."""
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD, json.dumps(HEAVY_PACKAGES)],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"importing main failed:\n{result.stderr.strip()}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--max-seconds", type=float, default=2.0)
+    parser.add_argument("--max-rss-mb", type=float, default=200.0)
+    parser.add_argument("--runs", type=int, default=3, help="import time is the fastest of this many runs")
+    args = parser.parse_args()
+
+    runs = [measure() for _ in range(args.runs)]
+    best = min(runs, key=lambda run: run["seconds"])
+    print(f"import main: {best['seconds']:.3f}s, {best['rss_mb']:.1f} MB peak RSS, {best['modules']} modules")
+
+    failures = []
+    for name, chain in sorted(best["heavy"].items()):
+        failures.append(f"{name} was imported at startup via:\n    " + "\n    ".join(chain or ["(unknown)"]))
+    if best["seconds"] > args.max_seconds:
+        failures.append(f"import took {best['seconds']:.3f}s, budget is {args.max_seconds}s")
+    if best["rss_mb"] > args.max_rss_mb:
+        failures.append(f"peak RSS was {best['rss_mb']:.1f} MB, budget is {args.max_rss_mb} MB")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Offline stand-ins for the external providers used by the render pipeline.
+
+gTTS is replaced by a synthetic sine tone. Image generation and downloads go
+through the real provider clients to a local HTTP server that answers like
+the OpenAI image API and serves deterministic gradient images. Each call
+sleeps for a configurable latency so benchmarks can model network round
+trips, and the server can fail a share of requests to exercise retries and
+circuit breaking.
+"""
+
+import io
+import os
+import json
+import time
+import random
+import tempfile
+import hashlib
+import threading
+import subprocess
+from contextlib import ExitStack, contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, quote, urlparse
+
+import imageio_ffmpeg
+from PIL import Image
+
+
+def _seed(text: str) -> int:
+    return int(hashlib.md5(text.encode()).hexdigest()[:8], 16)
+
+
+def write_tone(path: str, duration: float, frequency: int = 440) -> None:
+    """Write a sine tone of the given duration to an mp3 file."""
+    subprocess.run(
+        [
+            imageio_ffmpeg.get_ffmpeg_exe(), "-y", "-loglevel", "error",
+            "-f", "lavfi", "-i", f"sine=frequency={frequency}:duration={duration:.2f}",
+            path,
+        ],
+        check=True,
+    )
+
+
+def make_image(text: str, size=(512, 512)) -> bytes:
+    """Return PNG bytes of a gradient whose colours are derived from text."""
+    seed = _seed(text)
+    base = ((seed >> 16) & 0xFF, (seed >> 8) & 0xFF, seed & 0xFF)
+    img = Image.linear_gradient("L").resize(size).convert("RGB")
+    img = Image.blend(img, Image.new("RGB", size, base), 0.6)
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class FakeTTS:
+    """Drop-in replacement for gtts.gTTS that writes a tone instead of speech."""
+
+    latency = 0.0
+
+    def __init__(self, text, lang="en", tld="com", **kwargs):
+        self.text = text
+
+    def save(self, savefile):
+        time.sleep(self.latency)
+        duration = max(0.5, 0.3 * len(self.text.split()))
+        write_tone(savefile, duration, 200 + _seed(self.text) % 600)
+
+
+class StandInServer:
+    """
+    Local HTTP server standing in for the OpenAI image API and its image host.
+
+    POST /images/generations answers like OpenAI with the URL of an image on
+    this server, and GET /files/<name>?size=<w>x<h>&prompt=<prompt> serves it.
+    """
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, failure_status: int = 503):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.calls = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+        self._rng = random.Random(0)
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _fail(self) -> bool:
+        with self._lock:
+            self.calls += 1
+            failed = self._rng.random() < self.failure_rate
+            self.failures += failed
+            return failed
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body, content_type):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _answer(self, respond):
+                time.sleep(server.latency)
+                if server._fail():
+                    self._send(server.failure_status, b'{"error": {"message": "stand-in failure"}}', "application/json")
+                else:
+                    respond()
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if not self.path.endswith("/images/generations"):
+                    return self._send(404, b"{}", "application/json")
+
+                def respond():
+                    prompt, size = body.get("prompt", ""), body.get("size", "512x512")
+                    url = f"{server.url}/files/{_seed(prompt)}.png?size={size}&prompt={quote(prompt)}"
+                    payload = {"created": int(time.time()), "data": [{"url": url}]}
+                    self._send(200, json.dumps(payload).encode(), "application/json")
+
+                self._answer(respond)
+
+            def do_GET(self):
+                request = urlparse(self.path)
+                if not request.path.startswith("/files/"):
+                    return self._send(404, b"", "text/plain")
+                query = parse_qs(request.query)
+                width, height = query.get("size", ["512x512"])[0].split("x")
+                prompt = query.get("prompt", [""])[0]
+                self._answer(lambda: self._send(200, make_image(prompt, (int(width), int(height))), "image/png"))
+
+        return Handler
+
+
+@contextmanager
+def offline_providers(latency: float = 0.0, failure_rate: float = 0.0, rate_limits: bool = False):
+    """
+    Patch the render pipeline to use the offline stand-ins.
+
+    Args:
+        latency: Seconds each provider call sleeps, to model a network round trip
+        failure_rate: Share of image requests the stand-in server fails with HTTP 503
+        rate_limits: Keep the providers' token bucket limits; off by default so benchmarks measure the pipeline
+
+    Yields:
+        The StandInServer in use, for inspecting call counts
+    """
+    from storyboard import providers, services
+
+    tts = type("FakeTTS", (FakeTTS,), {"latency": latency})
+    with ExitStack() as stack:
+        server = stack.enter_context(StandInServer(latency, failure_rate))
+        stack.enter_context(mock.patch.object(services, "gTTS", tts))
+        stack.enter_context(mock.patch.object(services, "OPENAI_API_KEY", "stand-in"))
+        stack.enter_context(mock.patch.object(providers.image_generation, "base_url", server.url))
+        if not rate_limits:
+            for client in providers.PROVIDERS:
+                stack.enter_context(mock.patch.object(client, "bucket", providers.TokenBucket(0, 1)))
+        yield server
+
+
+@contextmanager
+def offline_workspace(latency: float = 0.0):
+    """
+    Run the render pipeline offline inside a throwaway directory.
+
+    Installs the provider stand-ins and points the image, audio, segment and
+    video caches at a fresh temporary directory, so every run starts cold.
+
+    Args:
+        latency: Seconds each provider call sleeps
+
+    Yields:
+        The temporary directory, which is also the working directory
+    """
+    from storyboard import cache, services
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        audio = cache.DiskCache(os.path.join(workdir, "audio"), 1 << 34, ".mp3")
+        segments = cache.DiskCache(os.path.join(workdir, "segments"), 1 << 34, ".mp4")
+        with offline_providers(latency), \
+                mock.patch.object(services, "audio_cache", lambda: audio), \
+                mock.patch.object(services, "segment_cache", lambda: segments), \
+                mock.patch.object(cache, "VIDEO_OUTPUT_DIR", os.path.join(workdir, "videos")):
+            os.chdir(workdir)
+            try:
+                yield workdir
+            finally:
+                os.chdir(cwd)
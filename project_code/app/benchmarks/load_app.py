@@ -0,0 +1,296 @@
+"""
+Load-test the API with concurrent virtual users and report latency per endpoint.
+
+Run from project_code/app:
+
+    python -m benchmarks.load_app --scenario mixed --users 50 --duration 30
+    python -m benchmarks.load_app --mix login=70,get_storyboards=30 --db-latency 0.002
+    python -m benchmarks.load_app --mongo-uri mongodb://localhost:27017 --scenario browse
+
+main.app is served in-process through httpx.ASGITransport. The database is
+an in-memory mongomock stand-in (optionally slowed by --db-latency) or, with
+--mongo-uri, a real mongod in a separate database. Renders are replaced by
+a fake backend that sleeps for --render-seconds, so /storyboard/generate
+exercises queueing and the storyboard insert without ffmpeg or providers.
+
+Every virtual user loops until --duration has passed, picking an endpoint
+by the scenario's weights. The report gives throughput, status counts and
+p50/p90/p99/max latency per endpoint, plus how long each request held the
+event loop: the time spent in its synchronous steps between awaits, and
+the longest single step. A background ticker measures the event-loop lag
+seen by everything else.
+"""
+
+import json
+import time
+import random
+import asyncio
+import argparse
+import collections.abc
+from unittest import mock
+
+import httpx
+
+SCENARIOS = {
+    "browse": {"login": 20, "get_storyboards": 60, "all_users": 20},
+    "signup": {"signup": 80, "login": 20},
+    "render": {"generate": 50, "get_storyboards": 50},
+    "mixed": {"login": 30, "signup": 10, "all_users": 10, "get_storyboards": 40, "generate": 10},
+}
+PASSWORD = "load-secret"
+FAKE_VIDEO = "frontend/generated_videos/load_test.mp4"
+
+
+class TimedCoroutine(collections.abc.Coroutine):
+    """Wraps a coroutine and adds up the time of each step it runs on the event loop."""
+
+    def __init__(self, coro):
+        self._coro = coro
+        self.busy = 0.0
+        self.longest = 0.0
+
+    def _timed(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            step = time.perf_counter() - start
+            self.busy += step
+            self.longest = max(self.longest, step)
+
+    def send(self, value):
+        return self._timed(self._coro.send, value)
+
+    def throw(self, *args):
+        return self._timed(self._coro.throw, *args)
+
+    def close(self):
+        return self._coro.close()
+
+    def __await__(self):
+        return self
+
+
+def percentile(values, fraction):
+    """Return the value below which the given fraction of sorted values fall."""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def parse_mix(text):
+    """Parse "name=weight,name=weight" into a weight dict."""
+    mix = {}
+    for part in text.split(","):
+        name, weight = part.split("=")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+class Harness:
+    """Issues the scenario's requests and records their outcome per endpoint."""
+
+    def __init__(self, client, seeded_users, rng):
+        self.client = client
+        self.users = list(seeded_users)
+        self.rng = rng
+        self.samples = {}
+        self.signups = 0
+        self.stories = 0
+
+    def _user(self):
+        return self.rng.choice(self.users)
+
+    def request_for(self, endpoint):
+        """Build the (method, path, kwargs) of one request to an endpoint."""
+        if endpoint == "login":
+            return "POST", "/user/login", {"json": {"username": self._user(), "password": PASSWORD}}
+        if endpoint == "signup":
+            self.signups += 1
+            username = f"load-signup-{self.signups}-{self.rng.randrange(1 << 30)}"
+            return "POST", "/user/signup", {"json": {"username": username, "password": PASSWORD}}
+        if endpoint == "all_users":
+            return "GET", "/user/all_users", {"params": {"limit": 10}}
+        if endpoint == "get_storyboards":
+            return "GET", "/storyboard/get_storyboards", {"params": {"username": self._user(), "limit": 10}}
+        if endpoint == "generate":
+            self.stories += 1
+            story = f"Load test story {self.stories}. It has two sentences."
+            return "POST", "/storyboard/generate", {"json": {"username": self._user(), "story": story}}
+        raise ValueError(f"Unknown endpoint {endpoint}")
+
+    async def call(self, endpoint):
+        method, path, kwargs = self.request_for(endpoint)
+        timed = TimedCoroutine(self.client.request(method, path, **kwargs))
+        start = time.perf_counter()
+        try:
+            response = await asyncio.ensure_future(timed)
+            body = response.json()
+            # Errors are returned with HTTP 200 and reported through success and code
+            status = str(body.get("code", response.status_code)) if body.get("success") is False else str(response.status_code)
+        except Exception as e:
+            status = type(e).__name__
+        elapsed = time.perf_counter() - start
+        sample = self.samples.setdefault(endpoint, {"latency": [], "busy": [], "longest": 0.0, "status": {}})
+        sample["latency"].append(elapsed)
+        sample["busy"].append(timed.busy)
+        sample["longest"] = max(sample["longest"], timed.longest)
+        sample["status"][status] = sample["status"].get(status, 0) + 1
+
+
+async def virtual_user(harness, mix, deadline, think):
+    endpoints = list(mix)
+    weights = [mix[name] for name in endpoints]
+    while time.perf_counter() < deadline:
+        await harness.call(harness.rng.choices(endpoints, weights)[0])
+        if think:
+            await asyncio.sleep(harness.rng.uniform(0, 2 * think))
+
+
+async def loop_lag_monitor(lags, interval, stop):
+    """Record how late a periodic wake-up fires, which is time the loop spent blocked."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, time.perf_counter() - start - interval))
+
+
+async def seed(client, users, storyboards_per_user):
+    """Create the users and storyboards the read endpoints will return."""
+    from utils.query_helpers import QueryHelper
+
+    names = [f"load-user-{i}" for i in range(users)]
+    for name in names:
+        await client.post("/user/signup", json={"username": name, "password": PASSWORD})
+    documents = [
+        {"username": name, "story": f"Seeded story {k} of {name}.", "video": FAKE_VIDEO.replace("frontend/", "")}
+        for name in names
+        for k in range(storyboards_per_user)
+    ]
+    if documents:
+        await asyncio.get_running_loop().run_in_executor(None, QueryHelper.bulk_insert, "storyboards", documents)
+    return names
+
+
+async def run(args, mix):
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load.test", timeout=None) as client:
+        users = await seed(client, args.seed_users, args.seed_storyboards)
+        harness = Harness(client, users, random.Random(args.seed))
+
+        lags = []
+        stop = asyncio.Event()
+        monitor = asyncio.ensure_future(loop_lag_monitor(lags, 0.005, stop))
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*(virtual_user(harness, mix, deadline, args.think) for _ in range(args.users)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await monitor
+    return harness.samples, sorted(lags), elapsed
+
+
+def report(samples, lags, elapsed, args, mix):
+    rows = {}
+    for endpoint, sample in sorted(samples.items()):
+        latency = sorted(sample["latency"])
+        busy = sorted(sample["busy"])
+        rows[endpoint] = {
+            "requests": len(latency),
+            "throughput_rps": round(len(latency) / elapsed, 2),
+            "status": sample["status"],
+            "latency_ms": {
+                "p50": round(1000 * percentile(latency, 0.50), 2),
+                "p90": round(1000 * percentile(latency, 0.90), 2),
+                "p99": round(1000 * percentile(latency, 0.99), 2),
+                "max": round(1000 * latency[-1], 2),
+            },
+            "loop_busy_ms": {
+                "p50": round(1000 * percentile(busy, 0.50), 3),
+                "p99": round(1000 * percentile(busy, 0.99), 3),
+                "longest_step": round(1000 * sample["longest"], 3),
+            },
+        }
+    summary = {
+        "config": {
+            "users": args.users, "duration": args.duration, "think": args.think, "mix": mix,
+            "db": args.mongo_uri or f"mongomock (latency {args.db_latency}s)", "render_seconds": args.render_seconds,
+        },
+        "elapsed_seconds": round(elapsed, 2),
+        "total_rps": round(sum(row["requests"] for row in rows.values()) / elapsed, 2),
+        "loop_lag_ms": {
+            "p50": round(1000 * percentile(lags, 0.50), 3),
+            "p99": round(1000 * percentile(lags, 0.99), 3),
+            "max": round(1000 * (lags[-1] if lags else 0.0), 3),
+        },
+        "endpoints": rows,
+    }
+
+    print(f"{args.users} users for {elapsed:.1f}s, {summary['total_rps']} req/s total")
+    print(f"{'endpoint':>16}  {'req':>6}  {'req/s':>7}  {'p50 ms':>8}  {'p90 ms':>8}  {'p99 ms':>8}  "
+          f"{'max ms':>8}  {'busy p99':>8}  {'step max':>8}  status")
+    for endpoint, row in rows.items():
+        latency, busy = row["latency_ms"], row["loop_busy_ms"]
+        print(f"{endpoint:>16}  {row['requests']:>6}  {row['throughput_rps']:>7}  {latency['p50']:>8}  "
+              f"{latency['p90']:>8}  {latency['p99']:>8}  {latency['max']:>8}  {busy['p99']:>8}  "
+              f"{busy['longest_step']:>8}  {row['status']}")
+    lag = summary["loop_lag_ms"]
+    print(f"event-loop lag: p50 {lag['p50']} ms, p99 {lag['p99']} ms, max {lag['max']} ms")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="mixed")
+    parser.add_argument("--mix", help="endpoint weights overriding the scenario, e.g. login=70,generate=30")
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds to run")
+    parser.add_argument("--think", type=float, default=0.0, help="mean seconds a user waits between requests")
+    parser.add_argument("--seed-users", type=int, default=50)
+    parser.add_argument("--seed-storyboards", type=int, default=20, help="storyboards created per seeded user")
+    parser.add_argument("--mongo-uri", help="use this mongod instead of the in-memory stand-in")
+    parser.add_argument("--db-latency", type=float, default=0.0, help="seconds each stand-in database call sleeps")
+    parser.add_argument("--render-seconds", type=float, default=2.0, help="time the fake render backend takes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+    mix = parse_mix(args.mix) if args.mix else SCENARIOS[args.scenario]
+
+    from storyboard import jobs
+    from utils.query_helpers import QueryHelper
+
+    if args.mongo_uri:
+        from pymongo import MongoClient
+
+        client = MongoClient(args.mongo_uri)
+        client.drop_database("AI_Story_Board_load")
+        db = client["AI_Story_Board_load"]
+    else:
+        import mongomock
+        from benchmarks.load_db_overlap import SlowDatabase
+
+        db = mongomock.MongoClient()["AI_Story_Board"]
+        if args.db_latency:
+            db = SlowDatabase(db, args.db_latency)
+
+    def fake_render(story, settings, stream=False, progress=None):
+        time.sleep(args.render_seconds)
+        return {"video": FAKE_VIDEO, "cached": False, "segments_total": 2, "segments_reused": 0}
+
+    with mock.patch.object(QueryHelper, "db", db), mock.patch.object(jobs, "_render_job", fake_render):
+        QueryHelper.ensure_indexes()
+        try:
+            samples, lags, elapsed = asyncio.run(run(args, mix))
+        finally:
+            jobs.job_manager.shutdown()
+    summary = report(samples, lags, elapsed, args, mix)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Show that concurrent API requests overlap their MongoDB round trips.
+
+Run from project_code/app:
+
+    python -m benchmarks.load_db_overlap --requests 50 --latency 0.05
+
+QueryHelper is pointed at an in-memory mongomock database whose calls sleep
+for --latency seconds. With the event loop blocked, N concurrent logins take
+about N * latency; with AsyncQueryHelper they take close to
+N * latency / DB_IO_WORKERS.
+"""
+
+import time
+import asyncio
+import argparse
+from unittest import mock
+
+import httpx
+import mongomock
+
+
+class SlowCollection:
+    """Proxy for a mongomock collection that sleeps before every call."""
+
+    def __init__(self, collection, latency: float):
+        self._collection = collection
+        self._latency = latency
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            time.sleep(self._latency)
+            return attr(*args, **kwargs)
+
+        return call
+
+
+class SlowDatabase:
+    """Proxy for a mongomock database that hands out SlowCollections."""
+
+    def __init__(self, db, latency: float):
+        self._db = db
+        self._latency = latency
+
+    def __getitem__(self, name):
+        return SlowCollection(self._db[name], self._latency)
+
+
+async def fire(requests: int) -> float:
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        payload = {"username": "load-user", "password": "secret"}
+        await client.post("/user/signup", json=payload)
+        start = time.perf_counter()
+        await asyncio.gather(*(client.post("/user/login", json=payload) for _ in range(requests)))
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    from utils.query_helpers import QueryHelper
+
+    db = SlowDatabase(mongomock.MongoClient()["AI_Story_Board"], args.latency)
+    with mock.patch.object(QueryHelper, "db", db):
+        elapsed = asyncio.run(fire(args.requests))
+
+    serialized = args.requests * args.latency
+    print(f"{args.requests} concurrent logins: {elapsed:.2f}s "
+          f"(fully serialized would be {serialized:.2f}s, overlap factor {serialized / elapsed:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
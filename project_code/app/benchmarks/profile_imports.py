@@ -0,0 +1,64 @@
+"""
+Report what importing a module costs, per package and per module.
+
+Run from project_code/app:
+
+    python -m benchmarks.profile_imports
+    python -m benchmarks.profile_imports --module storyboard.services --top 30
+
+The module is imported in a fresh interpreter with -X importtime. Self time
+is summed per top-level package, and the modules with the largest
+cumulative time (their own time plus everything they imported) are listed.
+"""
+
+import re
+import sys
+import argparse
+import subprocess
+
+LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def profile(module: str):
+    """Import module in a fresh interpreter and return (self_us, cumulative_us, depth, name) per import."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"importing {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+    entries = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((int(self_us), int(cumulative_us), len(indent) // 2, name))
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    entries = profile(args.module)
+    total = sum(self_us for self_us, _, _, _ in entries)
+    packages = {}
+    for self_us, _, _, name in entries:
+        package = name.split(".")[0]
+        count, spent = packages.get(package, (0, 0))
+        packages[package] = (count + 1, spent + self_us)
+
+    print(f"import {args.module}: {total / 1e6:.3f}s over {len(entries)} modules\n")
+    print(f"{'package':>28}  {'modules':>7}  {'self ms':>8}  {'share':>6}")
+    for package, (count, spent) in sorted(packages.items(), key=lambda item: -item[1][1])[: args.top]:
+        print(f"{package:>28}  {count:>7}  {spent / 1000:>8.1f}  {100 * spent / total:>5.1f}%")
+
+    print(f"\n{'module':>40}  {'cumulative ms':>13}  {'self ms':>8}")
+    for self_us, cumulative_us, _, name in sorted(entries, key=lambda entry: -entry[1])[: args.top]:
+        print(f"{name:>40}  {cumulative_us / 1000:>13.1f}  {self_us / 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -85,43 +85,113 @@ function generateVideo() {
   fetch(`${BASE_URL}/storyboard/generate`, {
     method: 'POST',
     headers: {'Content-Type': 'application/json'},
-    body: JSON.stringify({ username, story })
+    body: JSON.stringify({ username, story, stream: true })
   })
     .then(res => res.json())
     .then(data => {
       if (data.success) {
-        alert('Video generated!');
-        fetchVideos();
+        if (data.data.stream) playStream(data.data.stream);
+        followJob(data.data.job_id);
       } else {
         alert('Error generating video');
       }
     });
 }
 
+// PLAY THE RENDER WHILE IT IS STILL RUNNING
+// The playlist appears with the first finished scene, so loading is retried until then
+let livePlayer = null;
+function playStream(path) {
+  const video = document.getElementById('live-preview');
+  const src = `${BASE_URL}/${path}`;
+  video.style.display = 'block';
+  if (livePlayer) livePlayer.destroy();
+  livePlayer = null;
+
+  if (window.Hls && Hls.isSupported()) {
+    livePlayer = new Hls({ manifestLoadingMaxRetry: 60, manifestLoadingRetryDelay: 1000 });
+    livePlayer.loadSource(src);
+    livePlayer.attachMedia(video);
+    livePlayer.on(Hls.Events.MANIFEST_PARSED, () => video.play());
+  } else if (video.canPlayType('application/vnd.apple.mpegurl')) {
+    video.src = src;
+    video.play();
+  }
+}
+
+// FOLLOW RENDER PROGRESS UNTIL THE JOB FINISHES
+// The server pushes each step, and the finished storyboard arrives with the last event
+function followJob(jobId) {
+  const status = document.getElementById('render-progress');
+  const events = new EventSource(`${BASE_URL}/storyboard/jobs/${jobId}/events`);
+  let sentences = 0;
+  let scenes = 0;
+
+  const show = text => {
+    status.style.display = 'block';
+    status.textContent = text;
+  };
+
+  events.addEventListener('queued', () => show('Queued...'));
+  events.addEventListener('started', e => {
+    sentences = JSON.parse(e.data).sentences;
+    show(`Rendering ${sentences} sentences...`);
+  });
+  events.addEventListener('audio', e => show(`Narration ready for sentence ${JSON.parse(e.data).sentence + 1} of ${sentences}`));
+  events.addEventListener('image', e => show(`Background ready for sentence ${JSON.parse(e.data).sentence + 1} of ${sentences}`));
+  events.addEventListener('scene', e => {
+    scenes += 1;
+    show(`Encoding: ${JSON.parse(e.data).percent}% (${scenes} of ${sentences} scenes)`);
+  });
+  events.addEventListener('encoding', e => show(`Encoding: ${JSON.parse(e.data).percent}%`));
+  events.addEventListener('joining', () => show('Finishing video...'));
+  events.addEventListener('done', e => {
+    events.close();
+    const data = JSON.parse(e.data);
+    show('Video generated!');
+    const list = document.getElementById('video-list');
+    if (list.querySelector('p:only-child')) list.innerHTML = '';
+    list.prepend(videoItem(data.storyboard));
+  });
+  events.addEventListener('failed', e => {
+    events.close();
+    show('Error generating video: ' + JSON.parse(e.data).error);
+  });
+}
+
+// RENDER ONE STORYBOARD ENTRY
+function videoItem(entry) {
+  const item = document.createElement('div');
+  item.innerHTML = `
+    <p><strong>Story:</strong> ${entry.story}</p>
+    <video src="${entry.video}" controls width="100%"></video>
+    <hr/>
+  `;
+  return item;
+}
+
 // FETCH PREVIOUS VIDEOS
-function fetchVideos() {
+// Without a cursor the list is reloaded; with one, the next page is appended
+function fetchVideos(cursor) {
   const username = localStorage.getItem('username');
+  const params = new URLSearchParams({ username });
+  if (cursor) params.set('cursor', cursor);
 
-  fetch(`${BASE_URL}/storyboard/get_storyboards?username=${username}`)
+  fetch(`${BASE_URL}/storyboard/get_storyboards?${params}`)
     .then(res => res.json())
     .then(data => {
       const list = document.getElementById('video-list');
-      list.innerHTML = '';
+      const more = document.getElementById('load-more-videos');
+      if (!cursor) list.innerHTML = '';
 
       if (data.success && data.data.length > 0) {
-        data.data.forEach(entry => {
-          const item = document.createElement('div');
-          item.innerHTML = `
-            <p><strong>Story:</strong> ${entry.story}</p>
-            <video src="${entry.video}" controls width="100%"></video>
-            alert('Video generated!');
-            
-            <hr/>
-          `;
-          list.appendChild(item);
-        });
-      } else {
+        data.data.forEach(entry => list.appendChild(videoItem(entry)));
+        const next = data.pagination.next_cursor;
+        more.style.display = next ? 'inline-block' : 'none';
+        more.onclick = () => fetchVideos(next);
+      } else if (!cursor) {
         list.innerHTML = '<p>No videos found.</p>';
+        more.style.display = 'none';
       }
     });
 }
@@ -1,16 +1,21 @@
 # app/main.py
 
 import os
+import mimetypes
 from pathlib import Path
 from typing import Dict, Any
 
 from fastapi import FastAPI, HTTPException
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from user.routes import router as user_router
 from storyboard.routes import router as storyboard_router
+from storyboard.jobs import job_manager
 from utils.response_models import ErrorResponse
+from utils.async_query_helpers import AsyncQueryHelper
+from utils.metrics import metrics
 
 app = FastAPI()
 
@@ -31,7 +36,46 @@ try:
 except Exception:
     raise HTTPException(status_code=500, detail="Failed to initialize application routers")
 
+# ─── DATABASE INDEXES ───────────────────────────────────────────────────────────
+# Set QUERY_PLAN_DIAGNOSTICS=1 to explain the registered query shapes at startup
+QUERY_PLAN_DIAGNOSTICS = os.getenv("QUERY_PLAN_DIAGNOSTICS", "0") == "1"
+
+@app.on_event("startup")
+async def provision_indexes() -> None:
+    created = await AsyncQueryHelper.ensure_indexes()
+    if isinstance(created, ErrorResponse):
+        print(f"Index provisioning failed: {created.message}")
+        return
+    if QUERY_PLAN_DIAGNOSTICS:
+        reports = await AsyncQueryHelper.explain_query_shapes()
+        if isinstance(reports, ErrorResponse):
+            print(f"Query plan diagnostics failed: {reports.message}")
+            return
+        for report in reports:
+            status = "COLLSCAN" if report["collscan"] else "ok"
+            print(f"[query plan] {status}: {report['collection']} filter={report['filter']} "
+                  f"sort={report['sort']} stages={report['stages']}")
+
+# ─── RENDER WORKERS ─────────────────────────────────────────────────────────────
+@app.on_event("shutdown")
+def stop_render_workers() -> None:
+    job_manager.shutdown()
+
+# ─── METRICS ────────────────────────────────────────────────────────────────────
+# Registered before the static mounts, which would otherwise shadow these paths
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics() -> str:
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/metrics/slow")
+def slow_operations() -> Dict[str, Any]:
+    return {"slow_operations": metrics.slow_log()}
+
 # ─── STATIC FILES ───────────────────────────────────────────────────────────────
+# HLS segments, which the system MIME table often maps to something else
+mimetypes.add_type("video/mp2t", ".ts")
+mimetypes.add_type("application/vnd.apple.mpegurl", ".m3u8")
+
 # Serve generated videos at /generated_videos/<filename>
 app.mount(
     "/generated_videos",
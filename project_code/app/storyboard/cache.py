@@ -0,0 +1,435 @@
+import os
+import json
+import uuid
+import time
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from storyboard.models import RenderSettings
+from utils.metrics import cache_collector, metrics
+from utils.singleflight import SingleFlight
+
+# Directory served at /generated_videos
+VIDEO_OUTPUT_DIR = "frontend/generated_videos"
+# Progressive HLS playlists, one directory per render, served at /generated_videos/hls
+STREAM_OUTPUT_DIR = os.path.join(VIDEO_OUTPUT_DIR, "hls")
+# Seconds a progressive playlist is kept after its last update, so players can finish the preview
+STREAM_RETENTION_SECONDS = float(os.getenv("STREAM_RETENTION_SECONDS", "600"))
+# Persistent narration cache and its disk budget
+AUDIO_CACHE_DIR = os.getenv("AUDIO_CACHE_DIR", "cache/audio")
+AUDIO_CACHE_MAX_BYTES = int(os.getenv("AUDIO_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+# Persistent per-scene segment cache and its disk budget
+SEGMENT_CACHE_DIR = os.getenv("SEGMENT_CACHE_DIR", "cache/segments")
+SEGMENT_CACHE_MAX_BYTES = int(os.getenv("SEGMENT_CACHE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+
+
+class DiskCache:
+    """
+    A size-bounded, least-recently-used cache of files in a directory.
+
+    Entries are files named after their key. Hits refresh the entry's access
+    time so recency survives restarts, and the oldest entries are deleted once
+    the directory grows past max_bytes. Concurrent misses on the same key
+    create the file only once.
+
+    Several processes may share the directory, each with its own index. A
+    file another process wrote is adopted into this index on first lookup,
+    so it is reused instead of recreated and counts against the budget.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, suffix: str = ""):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._size = 0
+        self._load()
+
+    def _load(self) -> None:
+        """Index the files already on disk, oldest access first."""
+        os.makedirs(self.directory, exist_ok=True)
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(self.suffix) and ".part" not in entry.name:
+                stat = entry.stat()
+                files.append((stat.st_atime, entry.name[: len(entry.name) - len(self.suffix)], stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._size += size
+
+    def path_for(self, key: str) -> str:
+        """Return the path a key is stored at."""
+        return os.path.join(self.directory, key + self.suffix)
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached file.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Path of the cached file, or None on a miss
+        """
+        path = self.path_for(key)
+        with self._lock:
+            if key in self._entries and os.path.exists(path) or self._adopt(key, path):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                try:
+                    os.utime(path)
+                except OSError:
+                    pass
+                return path
+            if key in self._entries:
+                self._size -= self._entries.pop(key)
+            self.misses += 1
+            return None
+
+    def _adopt(self, key: str, path: str) -> bool:
+        """
+        Index a file written by another process sharing the directory.
+
+        Called with the lock held.
+
+        Returns:
+            True if the file exists and is now indexed
+        """
+        if key in self._entries:
+            return False
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return False
+        self._entries[key] = size
+        self._size += size
+        self._evict()
+        return key in self._entries
+
+    def get_or_create(self, key: str, create: Callable[[str], None]) -> str:
+        """
+        Return the cached file for key, creating it on a miss.
+
+        Args:
+            key: Cache key
+            create: Called with a temporary path that it must write the file to
+
+        Returns:
+            Path of the cached file
+        """
+        path = self.get(key)
+        if path:
+            return path
+        return self._flight.do(key, self._create, key, create)[0]
+
+    def _create(self, key: str, create: Callable[[str], None]) -> str:
+        path = self.path_for(key)
+        with self._lock:
+            if key in self._entries and os.path.exists(path) or self._adopt(key, path):
+                return path
+        temp_path = os.path.join(self.directory, f"{key}.{uuid.uuid4().hex[:8]}.part{self.suffix}")
+        try:
+            create(temp_path)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        with self._lock:
+            size = os.path.getsize(path)
+            self._size += size - self._entries.get(key, 0)
+            self._entries[key] = size
+            self._entries.move_to_end(key)
+            self._evict()
+        return path
+
+    def put(self, key: str, source: str) -> str:
+        """
+        Store an existing file under key, leaving the source in place.
+
+        Args:
+            key: Cache key
+            source: Path of the file to store
+
+        Returns:
+            Path of the cached file
+        """
+        path = self.path_for(key)
+        temp_path = os.path.join(self.directory, f"{key}.{uuid.uuid4().hex[:8]}.part{self.suffix}")
+        try:
+            link_or_copy(source, temp_path)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        with self._lock:
+            size = os.path.getsize(path)
+            self._size += size - self._entries.get(key, 0)
+            self._entries[key] = size
+            self._entries.move_to_end(key)
+            self._evict()
+        return path
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until the cache fits its budget."""
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._size -= size
+            self.evictions += 1
+            try:
+                os.remove(self.path_for(key))
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit, miss and eviction counters and the current size."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
+
+
+class MemoryCache:
+    """
+    A byte-bounded, least-recently-used in-memory cache.
+
+    Values are sized with their nbytes attribute (NumPy arrays) or counted as
+    one byte otherwise. Concurrent misses on the same key compute the value
+    only once.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._size = 0
+
+    @staticmethod
+    def _sizeof(value: Any) -> int:
+        return getattr(value, "nbytes", 1)
+
+    def get_or_create(self, key: Hashable, create: Callable[[], Any]) -> Any:
+        """
+        Return the cached value for key, computing it on a miss.
+
+        Args:
+            key: Cache key
+            create: Called without arguments to compute the value
+
+        Returns:
+            The cached value
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        return self._flight.do(repr(key), self._create, key, create)[0]
+
+    def _create(self, key: Hashable, create: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key in self._entries:
+                return self._entries[key]
+        value = create()
+        with self._lock:
+            self._entries[key] = value
+            self._size += self._sizeof(value)
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= self._sizeof(evicted)
+                self.evictions += 1
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit, miss and eviction counters and the current size."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
+
+
+def link_or_copy(source: str, destination: str) -> str:
+    """
+    Give a request its own handle on a cached file.
+
+    A hard link keeps the data readable even if the cache evicts the entry
+    mid-render; copying is the fallback across filesystems.
+
+    Args:
+        source: Path of the cached file
+        destination: Request-private path
+
+    Returns:
+        destination
+    """
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
+    return destination
+
+
+def audio_cache_key(text: str, lang: str, tld: str) -> str:
+    """
+    Build the key of a narration clip.
+
+    Args:
+        text: Sentence being spoken
+        lang: gTTS language
+        tld: gTTS top-level domain, which selects the accent
+
+    Returns:
+        Hex digest identifying the clip
+    """
+    payload = json.dumps({"text": text, "lang": lang, "tld": tld}, sort_keys=True)
+    return hashlib.md5(payload.encode()).hexdigest()
+
+
+def segment_cache_key(sentence: str, settings: RenderSettings) -> str:
+    """
+    Build the key of an encoded scene segment.
+
+    Args:
+        sentence: Sentence shown and narrated in the scene
+        settings: Render parameters
+
+    Returns:
+        Hex digest identifying the segment
+    """
+    payload = json.dumps({"sentence": sentence, "settings": settings.dict()}, sort_keys=True)
+    return hashlib.md5(payload.encode()).hexdigest()
+
+
+_audio_cache: Optional[DiskCache] = None
+_segment_cache: Optional[DiskCache] = None
+_caches_lock = threading.Lock()
+
+
+def audio_cache() -> DiskCache:
+    """Return the shared narration cache, creating its directory and index on first use."""
+    global _audio_cache
+    with _caches_lock:
+        if _audio_cache is None:
+            _audio_cache = DiskCache(AUDIO_CACHE_DIR, AUDIO_CACHE_MAX_BYTES, suffix=".mp3")
+            metrics.register_collector(cache_collector("audio", _audio_cache))
+        return _audio_cache
+
+
+def segment_cache() -> DiskCache:
+    """Return the shared scene segment cache, creating its directory and index on first use."""
+    global _segment_cache
+    with _caches_lock:
+        if _segment_cache is None:
+            _segment_cache = DiskCache(SEGMENT_CACHE_DIR, SEGMENT_CACHE_MAX_BYTES, suffix=".mp4")
+            metrics.register_collector(cache_collector("segment", _segment_cache))
+        return _segment_cache
+
+
+def render_cache_key(text: str, settings: RenderSettings) -> str:
+    """
+    Build the content key of a rendered storyboard.
+
+    The key covers the story text and every render parameter, so changing the
+    size, frame rate or voice produces a different video.
+
+    Args:
+        text: Input story text
+        settings: Render parameters
+
+    Returns:
+        Hex digest identifying the rendered video
+    """
+    payload = json.dumps({"text": text, "settings": settings.dict()}, sort_keys=True)
+    return hashlib.md5(payload.encode()).hexdigest()
+
+
+def video_path_for(key: str) -> str:
+    """
+    Return the path of the finished video for a render key.
+
+    Args:
+        key: Key returned by render_cache_key
+
+    Returns:
+        Path of the video inside VIDEO_OUTPUT_DIR
+    """
+    return os.path.join(VIDEO_OUTPUT_DIR, f"storyboard_{key[:16]}.mp4")
+
+
+def stream_path_for(key: str) -> str:
+    """
+    Return the path of the progressive HLS playlist for a render key.
+
+    Args:
+        key: Key returned by render_cache_key
+
+    Returns:
+        Path of the playlist inside STREAM_OUTPUT_DIR
+    """
+    return os.path.join(STREAM_OUTPUT_DIR, key[:16], "index.m3u8")
+
+
+def prune_streams(max_age: float = STREAM_RETENTION_SECONDS) -> int:
+    """
+    Delete progressive playlists that have not been updated for max_age seconds.
+
+    Once a render finishes its MP4 is served instead, so the playlist is only
+    kept long enough for players still following it.
+
+    Args:
+        max_age: Seconds since the playlist was last rewritten
+
+    Returns:
+        Number of playlist directories removed
+    """
+    if not os.path.isdir(STREAM_OUTPUT_DIR):
+        return 0
+    removed = 0
+    cutoff = time.time() - max_age
+    for name in os.listdir(STREAM_OUTPUT_DIR):
+        directory = os.path.join(STREAM_OUTPUT_DIR, name)
+        playlist = os.path.join(directory, "index.m3u8")
+        try:
+            updated = os.path.getmtime(playlist if os.path.exists(playlist) else directory)
+        except OSError:
+            continue
+        if updated < cutoff:
+            shutil.rmtree(directory, ignore_errors=True)
+            removed += 1
+    return removed
+
+
+def cached_video(key: str):
+    """
+    Return the finished video for a render key if it has already been rendered.
+
+    Args:
+        key: Key returned by render_cache_key
+
+    Returns:
+        Path of the video, or None on a cache miss
+    """
+    path = video_path_for(key)
+    return path if os.path.exists(path) else None
@@ -0,0 +1,221 @@
+import os
+import re
+import subprocess
+from typing import List, Tuple
+
+import imageio_ffmpeg
+import numpy as np
+from PIL import Image
+
+
+def ffmpeg_exe() -> str:
+    """Return the ffmpeg binary bundled with imageio-ffmpeg."""
+    return imageio_ffmpeg.get_ffmpeg_exe()
+
+
+def run_ffmpeg(args: List[str]) -> None:
+    """
+    Run ffmpeg with the given arguments.
+
+    Args:
+        args: Arguments after the executable
+
+    Raises:
+        RuntimeError: If ffmpeg exits with an error
+    """
+    result = subprocess.run(
+        [ffmpeg_exe(), "-y", "-loglevel", "error", *args],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.decode(errors='replace').strip()}")
+
+
+def media_duration(path: str) -> float:
+    """
+    Read the container duration of a media file.
+
+    Args:
+        path: Media file to inspect
+
+    Returns:
+        Duration in seconds
+
+    Raises:
+        RuntimeError: If ffmpeg reports no duration
+    """
+    # ffmpeg without an output exits with an error but still prints the input header
+    result = subprocess.run(
+        [ffmpeg_exe(), "-hide_banner", "-i", path],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    match = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", result.stderr.decode(errors="replace"))
+    if match is None:
+        raise RuntimeError(f"Could not read the duration of {path}")
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def flatten_scene(background: np.ndarray, caption: np.ndarray) -> np.ndarray:
+    """
+    Alpha-composite an RGBA caption over an RGB background.
+
+    Args:
+        background: RGB array of shape (height, width, 3)
+        caption: RGBA array of the same height and width
+
+    Returns:
+        The composited RGB frame
+    """
+    alpha = caption[..., 3:4].astype(np.float32) / 255.0
+    frame = background.astype(np.float32) * (1.0 - alpha) + caption[..., :3].astype(np.float32) * alpha
+    return frame.round().astype(np.uint8)
+
+
+def encode_still_scene(
+    frame: np.ndarray, audio_file: str, duration: float, output: str, fps: int, threads: int = 0
+) -> str:
+    """
+    Encode one held frame with its narration as an MP4 segment.
+
+    The frame is written once and looped by ffmpeg with the x264 still-image
+    tuning and a GOP covering the whole scene, so encoding cost depends on the
+    scene count rather than on per-frame compositing.
+
+    Args:
+        frame: RGB frame shown for the whole scene
+        audio_file: Narration of the scene
+        duration: Scene length in seconds
+        output: Path of the segment to write
+        fps: Output frame rate
+        threads: Encoder threads, 0 lets ffmpeg decide
+
+    Returns:
+        output
+    """
+    # yuv420p needs even dimensions, so an odd custom width or height loses its last pixel
+    height, width = frame.shape[:2]
+    frame = frame[: height - height % 2, : width - width % 2]
+    frame_path = os.path.splitext(output)[0] + ".png"
+    Image.fromarray(frame).save(frame_path, compress_level=1)
+    try:
+        run_ffmpeg([
+            "-loop", "1", "-framerate", str(fps), "-i", frame_path,
+            "-i", audio_file,
+            "-t", f"{duration:.3f}",
+            "-c:v", "libx264", "-tune", "stillimage", "-preset", "veryfast",
+            "-pix_fmt", "yuv420p", "-g", str(max(1, int(duration * fps) + 1)), "-r", str(fps),
+            "-c:a", "aac", "-b:a", "128k", "-ar", "44100", "-ac", "2",
+            "-threads", str(threads),
+            output,
+        ])
+    finally:
+        os.remove(frame_path)
+    return output
+
+
+def _write_concat_list(paths: List[str], list_path: str) -> str:
+    """Write an ffmpeg concat demuxer list of paths."""
+    with open(list_path, "w") as f:
+        for path in paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    return list_path
+
+
+def concat_audio(audio_files: List[str], output: str, workdir: str) -> str:
+    """
+    Join audio files with identical encoding settings without re-encoding.
+
+    Args:
+        audio_files: Audio paths, in playback order
+        output: Path of the joined audio
+        workdir: Directory for the concat list file
+
+    Returns:
+        output
+    """
+    list_path = _write_concat_list(audio_files, os.path.join(workdir, "audio.txt"))
+    run_ffmpeg(["-f", "concat", "-safe", "0", "-i", list_path, "-c", "copy", output])
+    return output
+
+
+def concat_segments(segments: List[str], output: str, workdir: str) -> str:
+    """
+    Join MP4 segments with identical encoding settings without re-encoding.
+
+    Args:
+        segments: Segment paths, in playback order
+        output: Path of the joined video
+        workdir: Directory for the concat list file
+
+    Returns:
+        output
+    """
+    list_path = _write_concat_list(segments, os.path.join(workdir, "segments.txt"))
+    run_ffmpeg([
+        "-f", "concat", "-safe", "0", "-i", list_path,
+        "-c", "copy", "-movflags", "+faststart",
+        output,
+    ])
+    return output
+
+
+def remux_to_ts(segment: str, output: str, offset: float) -> str:
+    """
+    Copy an MP4 segment into an MPEG-TS segment for HLS without re-encoding.
+
+    Args:
+        segment: MP4 segment to copy
+        output: Path of the .ts segment
+        offset: Start time of the segment in the playlist, in seconds
+
+    Returns:
+        output
+    """
+    run_ffmpeg([
+        "-i", segment,
+        "-c", "copy", "-bsf:v", "h264_mp4toannexb",
+        "-output_ts_offset", f"{offset:.3f}",
+        "-f", "mpegts",
+        output,
+    ])
+    return output
+
+
+def split_to_ts(segment: str, output_pattern: str, offset: float, piece_seconds: float) -> List[Tuple[str, float]]:
+    """
+    Cut an MP4 segment into MPEG-TS pieces of at most piece_seconds for HLS.
+
+    A still scene is a single GOP, so the video is re-encoded with a keyframe
+    at every cut; the audio is copied.
+
+    Args:
+        segment: MP4 segment to cut
+        output_pattern: Path of the pieces with a %02d placeholder for their index
+        offset: Start time of the segment in the playlist, in seconds
+        piece_seconds: Length of every piece but the last
+
+    Returns:
+        (path, duration) of each piece, in playback order
+    """
+    list_path = os.path.splitext(output_pattern)[0].replace("%02d", "pieces") + ".csv"
+    run_ffmpeg([
+        "-i", segment,
+        "-c:v", "libx264", "-tune", "stillimage", "-preset", "veryfast", "-pix_fmt", "yuv420p",
+        "-force_key_frames", f"expr:gte(t,n_forced*{piece_seconds:.3f})",
+        "-c:a", "copy",
+        "-output_ts_offset", f"{offset:.3f}",
+        "-f", "segment", "-segment_time", f"{piece_seconds:.3f}", "-segment_format", "mpegts",
+        "-segment_list", list_path, "-segment_list_type", "csv",
+        output_pattern,
+    ])
+    pieces = []
+    with open(list_path) as f:
+        for line in f:
+            name, start, end = line.strip().rsplit(",", 2)
+            pieces.append((os.path.join(os.path.dirname(output_pattern), name), float(end) - float(start)))
+    os.remove(list_path)
+    return pieces
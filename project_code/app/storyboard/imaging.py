@@ -0,0 +1,180 @@
+import os
+import hashlib
+import threading
+from functools import lru_cache
+from typing import Dict, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageEnhance, ImageFont, ImageOps
+
+from storyboard.cache import MemoryCache
+from utils.metrics import cache_collector, metrics
+
+# Brightness factor applied to backgrounds so captions stay readable
+BACKGROUND_BRIGHTNESS = 0.4
+# Memory budget for processed background frames
+DERIVATIVE_CACHE_MAX_BYTES = int(os.getenv("DERIVATIVE_CACHE_MAX_BYTES", str(128 * 1024 * 1024)))
+
+# Caption font, a TrueType file name or path; Pillow's built-in font is used if it cannot be loaded
+CAPTION_FONT = os.getenv("CAPTION_FONT", "DejaVuSans.ttf")
+CAPTION_FONT_SIZE = 25
+CAPTION_COLOR = "white"
+# Gap between the caption and the frame edges, and between caption lines
+CAPTION_MARGIN = 16
+CAPTION_LINE_SPACING = 4
+
+derivative_cache = MemoryCache(DERIVATIVE_CACHE_MAX_BYTES)
+metrics.register_collector(cache_collector("derivative", derivative_cache))
+
+_digest_lock = threading.Lock()
+_digests: Dict[Tuple[str, int, int], str] = {}
+
+
+def source_digest(image_path: str) -> str:
+    """
+    Return the md5 of an image file's contents.
+
+    Digests are memoized per (path, mtime, size), so an unchanged file is only
+    hashed once.
+
+    Args:
+        image_path: Path of the source image
+
+    Returns:
+        Hex digest of the file contents
+    """
+    stat = os.stat(image_path)
+    stamp = (image_path, stat.st_mtime_ns, stat.st_size)
+    with _digest_lock:
+        digest = _digests.get(stamp)
+    if digest is None:
+        with open(image_path, "rb") as f:
+            digest = hashlib.md5(f.read()).hexdigest()
+        with _digest_lock:
+            _digests[stamp] = digest
+    return digest
+
+
+def _process_background(image_path: str, size: Tuple[int, int], brightness: float) -> np.ndarray:
+    """Decode, crop to size and darken a background image."""
+    with Image.open(image_path) as img:
+        img = ImageOps.fit(img.convert("RGB"), size, Image.LANCZOS)
+    img = ImageEnhance.Brightness(img).enhance(brightness)
+    frame = np.asarray(img, dtype=np.uint8)
+    frame.setflags(write=False)
+    return frame
+
+
+def background_frame(
+    image_path: str, size: Tuple[int, int], brightness: float = BACKGROUND_BRIGHTNESS
+) -> np.ndarray:
+    """
+    Return a background image darkened and cropped to the output size.
+
+    Each derivative is computed once and kept in memory keyed by the source
+    hash and transform parameters, so cache hits skip decoding, resizing and
+    re-encoding entirely. A missing or unreadable image yields a black frame.
+
+    Args:
+        image_path: Path of the source image
+        size: Output (width, height)
+        brightness: Brightness factor, 1.0 keeps the original
+
+    Returns:
+        Read-only RGB array of shape (height, width, 3)
+    """
+    try:
+        key = (source_digest(image_path), "fit", tuple(size), "brightness", brightness)
+        return derivative_cache.get_or_create(
+            key, lambda: _process_background(image_path, tuple(size), brightness)
+        )
+    except Exception as e:
+        print(f"Error processing background image {image_path}: {e}")
+        return np.zeros((size[1], size[0], 3), dtype=np.uint8)
+
+
+@lru_cache(maxsize=32)
+def load_font(font: str, fontsize: int):
+    """
+    Load a font once per (font, size).
+
+    Args:
+        font: TrueType file name or path
+        fontsize: Size in pixels
+
+    Returns:
+        A Pillow font, falling back to the built-in font if font cannot be loaded
+    """
+    try:
+        return ImageFont.truetype(font, fontsize)
+    except OSError:
+        return ImageFont.load_default(size=fontsize)
+
+
+@lru_cache(maxsize=4096)
+def caption_layout(text: str, font: str, fontsize: int, box_width: int) -> Tuple[str, ...]:
+    """
+    Word-wrap a caption to fit a box width.
+
+    Words are placed greedily; a word wider than the box gets a line of its own.
+    Layouts are memoized per (text, font, size, box).
+
+    Args:
+        text: Caption text
+        font: TrueType file name or path
+        fontsize: Size in pixels
+        box_width: Available width in pixels
+
+    Returns:
+        The caption lines
+    """
+    loaded = load_font(font, fontsize)
+    lines = []
+    line = ""
+    for word in text.split():
+        candidate = f"{line} {word}" if line else word
+        if line and loaded.getlength(candidate) > box_width:
+            lines.append(line)
+            line = word
+        else:
+            line = candidate
+    if line:
+        lines.append(line)
+    return tuple(lines)
+
+
+def render_caption(
+    text: str,
+    size: Tuple[int, int],
+    fontsize: int = CAPTION_FONT_SIZE,
+    color: str = CAPTION_COLOR,
+    font: str = CAPTION_FONT,
+) -> np.ndarray:
+    """
+    Rasterize a caption as centred lines at the bottom of a transparent frame.
+
+    Args:
+        text: Caption text
+        size: Frame (width, height)
+        fontsize: Size in pixels
+        color: Text colour
+        font: TrueType file name or path
+
+    Returns:
+        RGBA array of shape (height, width, 4)
+    """
+    width, height = size
+    loaded = load_font(font, fontsize)
+    lines = caption_layout(text, font, fontsize, width - 2 * CAPTION_MARGIN)
+    ascent, descent = loaded.getmetrics()
+    line_height = ascent + descent
+    block_height = len(lines) * line_height + max(0, len(lines) - 1) * CAPTION_LINE_SPACING
+
+    img = Image.new("RGBA", size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    y = max(0, height - CAPTION_MARGIN - block_height)
+    for line in lines:
+        x = (width - loaded.getlength(line)) / 2
+        draw.text((x, y), line, font=loaded, fill=color)
+        y += line_height + CAPTION_LINE_SPACING
+    return np.asarray(img, dtype=np.uint8)
@@ -0,0 +1,465 @@
+import os
+import sys
+import uuid
+import datetime
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Dict, List, Optional, Union
+
+from storyboard.cache import cached_video, render_cache_key, stream_path_for
+from storyboard.models import RenderSettings
+from storyboard.progress import ProgressBroker
+from utils.async_query_helpers import io_executor
+from utils.metrics import Sample, metrics
+from utils.query_helpers import QueryHelper
+from utils.response_models import ErrorResponse
+
+# Number of renders that may run at the same time
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "2"))
+# "thread" keeps renders in the API process, "process" moves them to worker processes
+RENDER_EXECUTOR = os.getenv("RENDER_EXECUTOR", "thread")
+# Maximum number of queued + running jobs before new submissions are rejected
+RENDER_MAX_PENDING = int(os.getenv("RENDER_MAX_PENDING", "32"))
+# Number of finished jobs kept in memory for status lookups
+RENDER_JOB_RETENTION = int(os.getenv("RENDER_JOB_RETENTION", "500"))
+
+
+def _queue_progress(queue, key: str, event: Dict) -> None:
+    """Forward a progress event from a worker process to the API process."""
+    queue.put((key, event))
+
+
+def _render_job(
+    story: str, settings: RenderSettings, stream: bool = False, progress: Optional[Callable] = None
+) -> Dict:
+    """
+    Render a storyboard video inside a worker.
+
+    Kept at module level so it can be pickled for process workers.
+
+    Args:
+        story: Input story text
+        settings: Render parameters
+        stream: Publish scenes to the HLS playlist while rendering
+        progress: Receives the render's progress events
+
+    Returns:
+        The render result from render_storyboard
+    """
+    from storyboard.services import render_storyboard
+
+    result = render_storyboard(story, settings, stream=stream, progress=progress)
+    if not result["video"] or not os.path.exists(result["video"]):
+        raise RuntimeError("Render produced no video")
+    return result
+
+
+def _render_batch_job(
+    stories: List[str], settings: RenderSettings, progress: Optional[Callable] = None
+) -> Dict:
+    """
+    Render a batch of storyboards inside a worker.
+
+    Args:
+        stories: Input story texts
+        settings: Render parameters
+        progress: Receives the batch's progress events
+
+    Returns:
+        The batch result from render_storyboard_batch
+    """
+    from storyboard.services import render_storyboard_batch
+
+    return render_storyboard_batch(stories, settings, progress=progress)
+
+
+class JobManager:
+    """
+    Runs storyboard renders on a bounded worker pool and tracks their status.
+
+    Jobs are kept in memory. A storyboard document is written through
+    QueryHelper.insert_one only once its render has succeeded. Jobs whose
+    story and settings are already rendered complete immediately, and jobs
+    identical to one still in flight share its render.
+
+    Render progress is published to self.progress under each job id that
+    shares the render; process workers send it back through a manager queue.
+    A job that joins a render in flight receives its events from then on.
+    """
+
+    def __init__(
+        self,
+        workers: int = RENDER_WORKERS,
+        executor_type: str = RENDER_EXECUTOR,
+        max_pending: int = RENDER_MAX_PENDING,
+        retention: int = RENDER_JOB_RETENTION,
+    ):
+        self.workers = max(1, workers)
+        self.executor_type = executor_type
+        self.max_pending = max_pending
+        self.retention = retention
+        self._executor = None
+        self._lock = threading.RLock()
+        self._jobs: "OrderedDict[str, Dict]" = OrderedDict()
+        self._futures: Dict[str, Future] = {}
+        self._inflight: Dict[str, Future] = {}
+        self._watchers: Dict[str, List[str]] = {}
+        # Last "started" event of each in-flight render, replayed to jobs that join it later
+        self._started: Dict[str, Dict] = {}
+        self._manager = None
+        self._progress_queue = None
+        self.progress = ProgressBroker()
+
+    def _get_executor(self):
+        """Create the worker pool on first use."""
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._manager = multiprocessing.Manager()
+                self._progress_queue = self._manager.Queue()
+                threading.Thread(
+                    target=self._pump_progress, args=(self._progress_queue,), name="render-progress", daemon=True
+                ).start()
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="render"
+                )
+        return self._executor
+
+    def _progress_listener(self, key: str) -> Callable:
+        """Return a picklable progress callback for the render identified by key."""
+        if self.executor_type == "process":
+            return partial(_queue_progress, self._progress_queue, key)
+        return partial(self._on_progress, key)
+
+    def _pump_progress(self, queue) -> None:
+        """Deliver progress events sent by worker processes until shutdown."""
+        while True:
+            try:
+                item = queue.get()
+            except (EOFError, OSError):
+                return
+            if item is None:
+                return
+            self._on_progress(*item)
+
+    def _on_progress(self, key: str, event: Dict) -> None:
+        """Publish a render's progress event to every job sharing the render."""
+        with self._lock:
+            if event.get("stage") == "started":
+                self._started[key] = event
+            job_ids = list(self._watchers.get(key, []))
+        for job_id in job_ids:
+            self.progress.publish(job_id, event)
+
+    def submit(
+        self,
+        username: Optional[str],
+        story: str,
+        settings: Optional[RenderSettings] = None,
+        stream: bool = False,
+    ) -> Union[Dict, ErrorResponse]:
+        """
+        Queue a render and return the job record immediately.
+
+        With stream set and no cached video, the record's "stream" field is the
+        HLS playlist that receives each scene as soon as it is encoded.
+
+        Args:
+            username: Owner of the storyboard
+            story: Input story text
+            settings: Render parameters, defaults to RenderSettings()
+            stream: Publish scenes progressively while rendering
+
+        Returns:
+            The job record, or an ErrorResponse if the queue is full
+        """
+        settings = settings or RenderSettings()
+        key = render_cache_key(story, settings)
+        cached = cached_video(key)
+        stream = stream and cached is None
+        flight_key = f"{key}:stream" if stream else key
+        with self._lock:
+            if cached is None and len(self._inflight) >= self.max_pending:
+                return ErrorResponse(
+                    message="Render queue is full, try again later",
+                    code=503,
+                    errors=[{"message": "Render queue is full"}],
+                )
+            job_id = uuid.uuid4().hex
+            job = {
+                "job_id": job_id,
+                "kind": "single",
+                "username": username,
+                "story": story,
+                "status": "queued",
+                "video": None,
+                "stream": stream_path_for(key).replace("frontend/", "") if stream else None,
+                "storyboard": None,
+                "cached": cached is not None,
+                "segments_total": None,
+                "segments_reused": None,
+                "error": None,
+                "created_on": datetime.datetime.utcnow(),
+                "finished_on": None,
+            }
+            self._jobs[job_id] = job
+            # Published before the work is submitted so it always precedes the worker's events
+            self.progress.publish(job_id, {"stage": "queued", "cached": job["cached"]})
+            if cached is not None:
+                # Completed on the I/O executor so the storyboard insert stays off the event loop
+                future = io_executor.submit(
+                    dict, video=cached, cached=True, segments_total=None, segments_reused=None
+                )
+            elif flight_key in self._inflight:
+                future = self._inflight[flight_key]
+                self._watchers[flight_key].append(job_id)
+                if flight_key in self._started:
+                    self.progress.publish(job_id, self._started[flight_key])
+            else:
+                executor = self._get_executor()
+                self._watchers[flight_key] = [job_id]
+                future = executor.submit(
+                    _render_job, story, settings, stream, self._progress_listener(flight_key)
+                )
+                self._inflight[flight_key] = future
+                future.add_done_callback(lambda f: self._release(flight_key, f))
+            self._futures[job_id] = future
+        future.add_done_callback(lambda f: self._on_done(job_id, f))
+        return self._snapshot(job_id)
+
+    def submit_batch(
+        self, username: Optional[str], stories: List[str], settings: Optional[RenderSettings] = None
+    ) -> Union[Dict, ErrorResponse]:
+        """
+        Queue a batch render and return the job record immediately.
+
+        The whole batch runs as one job so sentences shared between stories are generated
+        once. Successful stories are persisted with a single QueryHelper.bulk_insert.
+
+        Args:
+            username: Owner of the storyboards
+            stories: Input story texts
+            settings: Render parameters, defaults to RenderSettings()
+
+        Returns:
+            The job record, or an ErrorResponse if the queue is full
+        """
+        settings = settings or RenderSettings()
+        with self._lock:
+            if len(self._inflight) >= self.max_pending:
+                return ErrorResponse(
+                    message="Render queue is full, try again later",
+                    code=503,
+                    errors=[{"message": "Render queue is full"}],
+                )
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "kind": "batch",
+                "username": username,
+                "stories": stories,
+                "status": "queued",
+                "results": None,
+                "timing": None,
+                "error": None,
+                "created_on": datetime.datetime.utcnow(),
+                "finished_on": None,
+            }
+            key = f"batch:{job_id}"
+            self.progress.publish(job_id, {"stage": "queued", "stories": len(stories)})
+            executor = self._get_executor()
+            self._watchers[key] = [job_id]
+            future = executor.submit(_render_batch_job, stories, settings, self._progress_listener(key))
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._release(key, f))
+            self._futures[job_id] = future
+        future.add_done_callback(lambda f: self._on_batch_done(job_id, f))
+        return self._snapshot(job_id)
+
+    def _on_batch_done(self, job_id: str, future: Future) -> None:
+        """Persist every successful story of a batch in one bulk insert."""
+        job = self._jobs[job_id]
+        if future.cancelled():
+            self._finish(job_id, "failed", error="Render was cancelled")
+            return
+        try:
+            batch = future.result()
+        except Exception as e:
+            self._finish(job_id, "failed", error=str(e))
+            return
+
+        results = [
+            {"story": story, **result}
+            for story, result in zip(job["stories"], batch["results"])
+        ]
+        # Only stories whose video was actually written get a storyboard
+        rendered = [
+            index for index, result in enumerate(results)
+            if result.get("video") and os.path.exists(result["video"])
+        ]
+        documents = [
+            {
+                "story": results[index]["story"],
+                "username": job["username"],
+                "video": results[index]["video"].replace("frontend/", ""),
+            }
+            for index in rendered
+        ]
+        if documents:
+            storyboards = QueryHelper.bulk_insert("storyboards", documents)
+            if isinstance(storyboards, ErrorResponse):
+                self._finish(job_id, "failed", error=storyboards.message)
+                return
+            # Inserted documents come back in order, so identical stories each get their own storyboard
+            for index, storyboard in zip(rendered, storyboards):
+                results[index]["storyboard"] = storyboard
+        job["results"] = results
+        job["timing"] = batch["timing"]
+        if documents:
+            self._finish(job_id, "succeeded")
+        else:
+            self._finish(job_id, "failed", error="No story in the batch could be rendered")
+
+    def _release(self, key: str, future: Future) -> None:
+        """Forget a finished in-flight render so the next request checks the cache again."""
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+                self._watchers.pop(key, None)
+                self._started.pop(key, None)
+
+    def _on_done(self, job_id: str, future: Future) -> None:
+        """Persist a successful render and record the final job state."""
+        job = self._jobs[job_id]
+        if future.cancelled():
+            self._finish(job_id, "failed", error="Render was cancelled")
+            return
+        try:
+            result = future.result()
+        except Exception as e:
+            self._finish(job_id, "failed", error=str(e))
+            return
+        link = result["video"]
+
+        storyboard = QueryHelper.insert_one(
+            "storyboards",
+            {
+                "story": job["story"],
+                "username": job["username"],
+                "video": link.replace("frontend/", ""),
+            },
+        )
+        if isinstance(storyboard, ErrorResponse):
+            self._finish(job_id, "failed", error=storyboard.message)
+            return
+        job["video"] = link
+        job["cached"] = result["cached"]
+        job["segments_total"] = result["segments_total"]
+        job["segments_reused"] = result["segments_reused"]
+        job["storyboard"] = storyboard
+        self._finish(job_id, "succeeded")
+
+    def _finish(self, job_id: str, status: str, error: Optional[str] = None) -> None:
+        """Mark a job as finished, publish its final event and drop the oldest finished jobs beyond retention."""
+        with self._lock:
+            job = self._jobs[job_id]
+            job["status"] = status
+            job["error"] = error
+            job["finished_on"] = datetime.datetime.utcnow()
+            self._futures.pop(job_id, None)
+            finished = [k for k, j in self._jobs.items() if j["finished_on"]]
+            expired = finished[: max(0, len(finished) - self.retention)]
+            for key in expired:
+                del self._jobs[key]
+        metrics.increment("render_jobs_total", kind=job["kind"], status=status)
+        self.progress.publish(job_id, self._final_event(job))
+        for key in expired:
+            self.progress.discard(key)
+
+    @staticmethod
+    def _final_event(job: Dict) -> Dict:
+        """Build the last progress event of a job from its record."""
+        if job["status"] != "succeeded":
+            return {"stage": "failed", "error": job["error"]}
+        if job["kind"] == "batch":
+            return {"stage": "done", "results": job["results"], "timing": job["timing"]}
+        return {
+            "stage": "done",
+            "video": job["video"].replace("frontend/", ""),
+            "cached": job["cached"],
+            "storyboard": job["storyboard"],
+        }
+
+    def _snapshot(self, job_id: str) -> Optional[Dict]:
+        """Return a copy of the job record with its live status."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            snapshot = dict(job)
+            future = self._futures.get(job_id)
+        if future is not None and future.running():
+            snapshot["status"] = "running"
+        return snapshot
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """
+        Look up a job by id.
+
+        Args:
+            job_id: Id returned by submit
+
+        Returns:
+            The job record, or None if unknown
+        """
+        return self._snapshot(job_id)
+
+    def list_jobs(self, username: Optional[str] = None) -> List[Dict]:
+        """
+        List known jobs, newest first.
+
+        Args:
+            username: If given, only return this user's jobs
+
+        Returns:
+            List of job records
+        """
+        with self._lock:
+            job_ids = [
+                k for k, j in self._jobs.items()
+                if username is None or j["username"] == username
+            ]
+        jobs = [self._snapshot(job_id) for job_id in reversed(job_ids)]
+        return [job for job in jobs if job is not None]
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Stop the worker pool and the scene render farm, if it was started."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+        if self._manager is not None:
+            self._progress_queue.put(None)
+            self._manager.shutdown()
+            self._manager = None
+        render_farm = sys.modules.get("storyboard.render_farm")
+        if render_farm is not None:
+            render_farm.shutdown()
+
+
+    def collect_metrics(self) -> List[Sample]:
+        """Export the number of renders in flight and of jobs not yet finished."""
+        with self._lock:
+            inflight = len(self._inflight)
+            pending = sum(1 for job in self._jobs.values() if not job["finished_on"])
+        return [
+            Sample("render_inflight", "gauge", {}, inflight),
+            Sample("render_jobs_pending", "gauge", {}, pending),
+        ]
+
+
+job_manager = JobManager()
+metrics.register_collector(job_manager.collect_metrics)
@@ -1,9 +1,37 @@
-from typing import Optional
-from pydantic import BaseModel, EmailStr
+from typing import List, Optional
+from gtts.lang import tts_langs
+from pydantic import BaseModel, EmailStr, conint, validator
+
+# Google Translate domains gTTS can voice through; each gives a regional accent
+TTS_TLDS = {"com", "us", "co.uk", "com.au", "ca", "co.in", "ie", "co.za", "com.ng", "com.br", "pt", "com.mx", "es", "fr"}
+
+class RenderSettings(BaseModel):
+    width: conint(ge=64, le=1920) = 512
+    height: conint(ge=64, le=1920) = 512
+    fps: conint(ge=1, le=60) = 24
+    lang: str = "en"
+    tld: str = "com"
+
+    @validator("lang")
+    def lang_supported(cls, value):
+        if value not in tts_langs():
+            raise ValueError(f"unsupported language: {value}")
+        return value
+
+    @validator("tld")
+    def tld_supported(cls, value):
+        if value not in TTS_TLDS:
+            raise ValueError(f"unsupported tld: {value}")
+        return value
 
 class StoryBoard(BaseModel):
     username: Optional[str]
     story:str
     video: Optional[str]
-    
-    
\ No newline at end of file
+    settings: RenderSettings = RenderSettings()
+    stream: bool = False
+
+class BatchStoryBoard(BaseModel):
+    username: Optional[str]
+    stories: List[str]
+    settings: RenderSettings = RenderSettings()
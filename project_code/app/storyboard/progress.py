@@ -0,0 +1,110 @@
+import json
+import asyncio
+import threading
+from typing import AsyncIterator, Dict, List, Tuple
+
+# Seconds between keep-alive comments on an idle event stream
+SSE_KEEPALIVE_SECONDS = 15
+# Stages after which a job publishes nothing more
+TERMINAL_STAGES = ("done", "failed")
+
+
+class ProgressBroker:
+    """
+    Keeps the progress events of each job and pushes new ones to live subscribers.
+
+    Events may be published from any thread. Each event is numbered within its
+    job, and subscribers first receive the events published before they joined,
+    so a client that connects late, or reconnects with Last-Event-ID, misses nothing.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events: Dict[str, List[Dict]] = {}
+        self._subscribers: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+
+    def publish(self, job_id: str, event: Dict) -> None:
+        """
+        Record an event for a job and deliver it to the job's subscribers.
+
+        Args:
+            job_id: Job the event belongs to
+            event: JSON-serializable event with at least a "stage" field
+        """
+        with self._lock:
+            events = self._events.setdefault(job_id, [])
+            event = {"id": len(events), **event}
+            events.append(event)
+            subscribers = list(self._subscribers.get(job_id, []))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+            except RuntimeError:
+                # The subscriber's event loop has closed; publishing runs on render threads and must not fail
+                self.unsubscribe(job_id, queue)
+
+    def subscribe(self, job_id: str, after: int = -1) -> Tuple[List[Dict], asyncio.Queue]:
+        """
+        Start receiving a job's events on the running event loop.
+
+        Args:
+            job_id: Job to follow
+            after: Id of the last event the client already has
+
+        Returns:
+            Tuple of (events already published after that id, queue receiving new events)
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        with self._lock:
+            history = [event for event in self._events.get(job_id, []) if event["id"] > after]
+            self._subscribers.setdefault(job_id, []).append((asyncio.get_running_loop(), queue))
+        return history, queue
+
+    def unsubscribe(self, job_id: str, queue: asyncio.Queue) -> None:
+        """Stop delivering a job's events to queue."""
+        with self._lock:
+            subscribers = self._subscribers.get(job_id, [])
+            subscribers[:] = [entry for entry in subscribers if entry[1] is not queue]
+            if not subscribers:
+                self._subscribers.pop(job_id, None)
+
+    def discard(self, job_id: str) -> None:
+        """Forget the events of a job that is no longer retained."""
+        with self._lock:
+            self._events.pop(job_id, None)
+
+
+def format_sse(event: Dict) -> str:
+    """Encode an event as a server-sent events message."""
+    return f"id: {event['id']}\nevent: {event['stage']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+async def event_stream(broker: ProgressBroker, job_id: str, after: int = -1) -> AsyncIterator[str]:
+    """
+    Yield a job's progress as server-sent events until it finishes.
+
+    Args:
+        broker: Broker the job publishes to
+        job_id: Job to follow
+        after: Id of the last event the client already has
+
+    Yields:
+        SSE messages, plus a keep-alive comment whenever the stream is idle
+    """
+    history, queue = broker.subscribe(job_id, after)
+    try:
+        for event in history:
+            yield format_sse(event)
+            if event["stage"] in TERMINAL_STAGES:
+                return
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield format_sse(event)
+            if event["stage"] in TERMINAL_STAGES:
+                return
+    finally:
+        broker.unsubscribe(job_id, queue)
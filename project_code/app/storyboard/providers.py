@@ -0,0 +1,397 @@
+import os
+import time
+import random
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+import openai
+import requests
+from gtts.tts import gTTSError
+from requests.adapters import HTTPAdapter
+
+from utils.metrics import Sample, metrics
+
+# Connections kept open per provider host; should cover the asset concurrency
+PROVIDER_POOL_SIZE = int(os.getenv("PROVIDER_POOL_SIZE", "16"))
+# Attempts after the first one for a failed provider call that is worth retrying
+PROVIDER_RETRIES = int(os.getenv("PROVIDER_RETRIES", "3"))
+# Base and maximum delay of the jittered exponential backoff between attempts, in seconds
+PROVIDER_BACKOFF_SECONDS = float(os.getenv("PROVIDER_BACKOFF_SECONDS", "0.5"))
+PROVIDER_BACKOFF_MAX_SECONDS = float(os.getenv("PROVIDER_BACKOFF_MAX_SECONDS", "8"))
+# Consecutive failed attempts after which a provider's circuit opens
+PROVIDER_BREAKER_FAILURES = int(os.getenv("PROVIDER_BREAKER_FAILURES", "5"))
+# Seconds an open circuit rejects calls before letting a trial call through
+PROVIDER_BREAKER_RESET_SECONDS = float(os.getenv("PROVIDER_BREAKER_RESET_SECONDS", "30"))
+# Provider calls slower than this many seconds are logged as slow; image generation routinely takes several
+PROVIDER_SLOW_SECONDS = float(os.getenv("PROVIDER_SLOW_SECONDS", "30"))
+
+# OpenAI image generation: requests per second, burst and timeout in seconds
+IMAGE_GENERATE_RATE = float(os.getenv("IMAGE_GENERATE_RATE", "0.8"))
+IMAGE_GENERATE_BURST = int(os.getenv("IMAGE_GENERATE_BURST", "5"))
+IMAGE_GENERATE_TIMEOUT = float(os.getenv("IMAGE_GENERATE_TIMEOUT", "60"))
+# Base URL of the image API, e.g. a local stand-in server; empty uses OpenAI's
+IMAGE_API_BASE = os.getenv("IMAGE_API_BASE", "")
+# Downloads of generated images: requests per second, burst and timeout in seconds
+IMAGE_DOWNLOAD_RATE = float(os.getenv("IMAGE_DOWNLOAD_RATE", "10"))
+IMAGE_DOWNLOAD_BURST = int(os.getenv("IMAGE_DOWNLOAD_BURST", "20"))
+IMAGE_DOWNLOAD_TIMEOUT = float(os.getenv("IMAGE_DOWNLOAD_TIMEOUT", "30"))
+# gTTS speech synthesis: requests per second, burst and timeout in seconds
+TTS_RATE = float(os.getenv("TTS_RATE", "5"))
+TTS_BURST = int(os.getenv("TTS_BURST", "10"))
+TTS_TIMEOUT = float(os.getenv("TTS_TIMEOUT", "30"))
+
+# HTTP statuses that signal a transient provider problem
+RETRYABLE_STATUSES = frozenset({408, 409, 425, 429, 500, 502, 503, 504})
+# OpenAI errors raised for transient problems without an HTTP status
+RETRYABLE_OPENAI_ERRORS = (
+    openai.error.APIConnectionError,
+    openai.error.Timeout,
+    openai.error.TryAgain,
+    openai.error.RateLimitError,
+    openai.error.ServiceUnavailableError,
+)
+
+
+class ProviderHTTPError(Exception):
+    """A provider answered with an unsuccessful HTTP status."""
+
+    def __init__(self, provider: str, status: int, retry_after: Optional[float] = None):
+        super().__init__(f"{provider} returned HTTP {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(Exception):
+    """A provider is failing, so calls are rejected without contacting it."""
+
+
+class TokenBucket:
+    """
+    Rate limiter allowing `rate` calls per second with bursts of up to `burst`.
+
+    Callers that find the bucket empty reserve the next token and sleep until
+    it is due, so waiting callers are served in arrival order. A rate of zero
+    or less disables the limit.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Take a token, waiting for one if necessary.
+
+        Returns:
+            Seconds spent waiting
+        """
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+class CircuitBreaker:
+    """
+    Stops calling a provider after repeated failures.
+
+    The circuit opens after `failures` consecutive failed attempts and
+    rejects calls for `reset_seconds`. Then one trial call is let through:
+    its success closes the circuit, its failure opens it again. A trial that
+    ends without a verdict, such as a local error, is released with
+    end_call() so the next call can try instead.
+    """
+
+    def __init__(self, failures: int, reset_seconds: float):
+        self.failures = failures
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self._consecutive = 0
+        self._opened_at = 0.0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def before_call(self, provider: str) -> None:
+        """
+        Check that a call may go ahead.
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half open with a trial already in flight
+        """
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self.state = "half_open"
+                self._trial = False
+            if self.state == "open" or (self.state == "half_open" and self._trial):
+                raise CircuitOpenError(f"{provider} circuit is open after repeated failures")
+            if self.state == "half_open":
+                self._trial = True
+
+    def end_call(self) -> None:
+        """Release the half-open trial slot taken by before_call, whatever the outcome."""
+        with self._lock:
+            self._trial = False
+
+    def record(self, success: bool) -> None:
+        """Record the outcome of an attempt."""
+        with self._lock:
+            if success:
+                self.state = "closed"
+                self._consecutive = 0
+                return
+            self._consecutive += 1
+            if self.state == "half_open" or self._consecutive >= self.failures:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+class PooledSession(requests.Session):
+    """requests.Session with a sized connection pool and an upper bound on every timeout."""
+
+    def __init__(self, pool_size: int, timeout: float):
+        super().__init__()
+        self.timeout = timeout
+        # Retries are done by ProviderClient, which also honours rate limits and the circuit
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+
+    def request(self, method, url, **kwargs):
+        # Callers such as openai pass a generous timeout of their own; the provider's bound wins
+        timeout = kwargs.get("timeout")
+        if timeout is None or (isinstance(timeout, (int, float)) and timeout > self.timeout):
+            kwargs["timeout"] = self.timeout
+        return super().request(method, url, **kwargs)
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Tell whether a failed provider call is worth retrying.
+
+    Connection problems, timeouts, rate limiting and server errors are;
+    rejected requests such as an unsafe image prompt are not.
+
+    Args:
+        error: Exception raised by the call
+
+    Returns:
+        True if the call may succeed when retried
+    """
+    if isinstance(error, ProviderHTTPError):
+        return error.status in RETRYABLE_STATUSES
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(error, RETRYABLE_OPENAI_ERRORS):
+        return True
+    if isinstance(error, openai.error.OpenAIError):
+        return error.http_status in RETRYABLE_STATUSES
+    if isinstance(error, gTTSError):
+        # gTTS keeps the response it failed on, or None for connection errors
+        return error.rsp is None or error.rsp.status_code in RETRYABLE_STATUSES
+    return False
+
+
+def is_rejection(error: Exception) -> bool:
+    """
+    Tell whether the provider answered and refused the request itself.
+
+    A rejection, such as an unsafe image prompt, shows the provider is up,
+    unlike local errors that never reached it or failed after it answered.
+
+    Args:
+        error: Exception raised by the call
+
+    Returns:
+        True for a 4xx answer other than the retryable statuses
+    """
+    if isinstance(error, ProviderHTTPError):
+        return 400 <= error.status < 500 and error.status not in RETRYABLE_STATUSES
+    if isinstance(error, openai.error.InvalidRequestError):
+        return True
+    if isinstance(error, gTTSError) and error.rsp is not None:
+        return 400 <= error.rsp.status_code < 500 and error.rsp.status_code not in RETRYABLE_STATUSES
+    return False
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Return the delay a provider asked for in a Retry-After header, if any."""
+    if isinstance(error, ProviderHTTPError):
+        return error.retry_after
+    headers = getattr(error, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after") or headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+class ProviderClient:
+    """
+    Calls to one external provider, with a shared connection pool, a token
+    bucket rate limit, timeouts, retries with jittered backoff and a circuit
+    breaker.
+
+    Point base_url at a local stand-in server to run without the real
+    provider; benchmarks/fakes.py does this.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: int,
+        timeout: float,
+        base_url: Optional[str] = None,
+        retries: int = PROVIDER_RETRIES,
+    ):
+        self.name = name
+        self.timeout = timeout
+        self.base_url = base_url or None
+        self.retries = retries
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(PROVIDER_BREAKER_FAILURES, PROVIDER_BREAKER_RESET_SECONDS)
+        self.session = PooledSession(PROVIDER_POOL_SIZE, timeout)
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        # Full jitter keeps clients that failed together from retrying together
+        delay = random.uniform(0, min(PROVIDER_BACKOFF_MAX_SECONDS, PROVIDER_BACKOFF_SECONDS * 2 ** attempt))
+        retry_after = _retry_after(error)
+        return max(delay, min(retry_after, PROVIDER_BACKOFF_MAX_SECONDS)) if retry_after else delay
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Call the provider through fn, retrying transient failures.
+
+        Args:
+            fn: Function making one request to the provider
+            *args, **kwargs: Arguments passed to fn
+
+        Returns:
+            What fn returns
+
+        Raises:
+            CircuitOpenError: If the provider's circuit is open
+            Exception: The last error of fn if it is not retryable or attempts ran out
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                self.breaker.before_call(self.name)
+            except CircuitOpenError:
+                metrics.increment("provider_rejected_total", provider=self.name)
+                raise
+            try:
+                waited = self.bucket.acquire()
+                if waited:
+                    metrics.observe("provider_throttle_seconds", waited, provider=self.name)
+                with metrics.span("provider_request", slow_after=PROVIDER_SLOW_SECONDS, provider=self.name):
+                    result = fn(*args, **kwargs)
+            except Exception as e:
+                retryable = is_retryable(e)
+                if retryable:
+                    self.breaker.record(False)
+                elif is_rejection(e):
+                    # The provider answered, so it is healthy even though the request was refused
+                    self.breaker.record(True)
+                # Errors that say nothing about the provider leave its state alone but free the trial slot
+                self.breaker.end_call()
+                if not retryable or attempt == self.retries:
+                    raise
+                delay = self._backoff(attempt, e)
+                metrics.increment("provider_retries_total", provider=self.name)
+                print(f"{self.name} request failed ({e}), retrying in {delay:.2f}s")
+                time.sleep(delay)
+            else:
+                self.breaker.record(True)
+                self.breaker.end_call()
+                return result
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """
+        GET a URL over the pooled session.
+
+        Args:
+            url: Absolute URL
+            **kwargs: Passed to requests
+
+        Returns:
+            The successful response
+
+        Raises:
+            ProviderHTTPError: If the final attempt answered with a non-200 status
+        """
+
+        def fetch():
+            response = self.session.get(url, **kwargs)
+            if response.status_code != 200:
+                retry_after = response.headers.get("Retry-After")
+                raise ProviderHTTPError(
+                    self.name, response.status_code, float(retry_after) if retry_after and retry_after.isdigit() else None
+                )
+            return response
+
+        return self.call(fetch)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the circuit state."""
+        return {"circuit": self.breaker.state}
+
+
+image_generation = ProviderClient(
+    "image_generate", IMAGE_GENERATE_RATE, IMAGE_GENERATE_BURST, IMAGE_GENERATE_TIMEOUT, IMAGE_API_BASE
+)
+image_downloads = ProviderClient("image_download", IMAGE_DOWNLOAD_RATE, IMAGE_DOWNLOAD_BURST, IMAGE_DOWNLOAD_TIMEOUT)
+# gTTS opens its own session per request, so only the limits, retries and circuit apply to speech
+speech = ProviderClient("tts", TTS_RATE, TTS_BURST, TTS_TIMEOUT)
+
+PROVIDERS = [image_generation, image_downloads, speech]
+
+
+def generate_image(prompt: str, size: str = "512x512") -> str:
+    """
+    Generate one image with OpenAI.
+
+    Args:
+        prompt: Description of the image
+        size: Image size as "<width>x<height>"
+
+    Returns:
+        The URL of the generated image
+    """
+    # openai reuses this session for its requests instead of opening one per thread
+    openai.requestssession = image_generation.session
+    response = image_generation.call(
+        openai.Image.create, prompt=prompt, n=1, size=size, api_base=image_generation.base_url
+    )
+    return response["data"][0]["url"]
+
+
+def download(url: str) -> bytes:
+    """
+    Download a generated image.
+
+    Args:
+        url: URL returned by generate_image
+
+    Returns:
+        The image bytes
+    """
+    return image_downloads.get(url).content
+
+
+def _collect_providers() -> List[Sample]:
+    return [
+        Sample("provider_circuit_open", "gauge", {"provider": client.name}, int(client.breaker.state != "closed"))
+        for client in PROVIDERS
+    ]
+
+
+metrics.register_collector(_collect_providers)
@@ -0,0 +1,171 @@
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from storyboard.encoder import encode_still_scene, flatten_scene
+from storyboard.imaging import background_frame, render_caption
+from utils.metrics import metrics
+
+# "serial" encodes scenes in the rendering thread, "parallel" spreads them over worker processes
+RENDER_BACKEND = os.getenv("RENDER_BACKEND", "serial")
+# Worker processes used by the parallel backend
+RENDER_FARM_WORKERS = int(os.getenv("RENDER_FARM_WORKERS", str(os.cpu_count() or 1)))
+
+_pool: Optional[ProcessPoolExecutor] = None
+# Threads waiting on shared, cached encodes for the parallel backend
+_dispatcher: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+class SceneTask(NamedTuple):
+    """Everything a worker needs to encode one scene."""
+
+    background_image: str
+    sentence: str
+    size: Tuple[int, int]
+    audio_file: str
+    duration: float
+    fps: int
+    output: str
+    threads: int = 0
+
+
+def scene_frame(background_image: str, sentence: str, size: Tuple[int, int]) -> np.ndarray:
+    """
+    Flatten one scene's background and caption into a single RGB frame.
+
+    Args:
+        background_image: Path of the source background
+        sentence: Caption text
+        size: Output (width, height)
+
+    Returns:
+        The composited RGB frame
+    """
+    with metrics.span("render_stage", stage="background"):
+        background = background_frame(background_image, size)
+    with metrics.span("render_stage", stage="caption"):
+        caption = render_caption(sentence, size)
+    return flatten_scene(background, caption)
+
+
+def encode_scene(task: SceneTask) -> str:
+    """
+    Build and encode one scene segment.
+
+    Kept at module level so it can be pickled for worker processes.
+
+    Args:
+        task: The scene to encode
+
+    Returns:
+        Path of the encoded segment
+    """
+    frame = scene_frame(task.background_image, task.sentence, task.size)
+    with metrics.span("render_stage", stage="scene_encode"):
+        return encode_still_scene(frame, task.audio_file, task.duration, task.output, task.fps, task.threads)
+
+
+def configure(backend: Optional[str] = None, workers: Optional[int] = None) -> None:
+    """
+    Change the backend or worker count, restarting the worker pool if needed.
+
+    Args:
+        backend: "serial" or "parallel"
+        workers: Worker processes for the parallel backend
+    """
+    global RENDER_BACKEND, RENDER_FARM_WORKERS, _pool, _dispatcher
+    with _pool_lock:
+        if backend is not None:
+            RENDER_BACKEND = backend
+        if workers is not None and workers != RENDER_FARM_WORKERS:
+            RENDER_FARM_WORKERS = workers
+            if _pool is not None:
+                _pool.shutdown(wait=True)
+                _pool = None
+            if _dispatcher is not None:
+                _dispatcher.shutdown(wait=True)
+                _dispatcher = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Create the shared worker pool on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=max(1, RENDER_FARM_WORKERS))
+        return _pool
+
+
+def _get_dispatcher() -> ThreadPoolExecutor:
+    """Create the threads that wait on cached encodes on first use."""
+    global _dispatcher
+    with _pool_lock:
+        if _dispatcher is None:
+            # Twice the workers keeps the pool busy while finished encodes are moved into the cache
+            _dispatcher = ThreadPoolExecutor(
+                max_workers=2 * max(1, RENDER_FARM_WORKERS), thread_name_prefix="scene-dispatch"
+            )
+        return _dispatcher
+
+
+def _run_now(fn, *args) -> Future:
+    """Run fn in the calling thread and return its outcome as a finished future."""
+    future = Future()
+    try:
+        future.set_result(fn(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def submit_scene(task: SceneTask, cache=None, key: Optional[str] = None) -> Future:
+    """
+    Start encoding one scene with the configured backend.
+
+    The serial backend encodes in the calling thread and returns a finished
+    future; the parallel backend queues the scene on the shared worker pool.
+    With a cache, the segment is created through cache.get_or_create, so
+    concurrent renders needing the same scene share one encode.
+
+    Args:
+        task: The scene to encode
+        cache: DiskCache to store the segment in, or None to keep it at task.output
+        key: Cache key of the scene
+
+    Returns:
+        Future resolving to the segment path, inside the cache if one was given
+    """
+    if cache is None:
+        return _submit(task)
+
+    def create(path):
+        _submit(task._replace(output=path)).result()
+
+    if RENDER_BACKEND != "parallel":
+        return _run_now(cache.get_or_create, key, create)
+    # Waiting on the shared encode happens on a dispatch thread so the caller keeps submitting scenes
+    return _get_dispatcher().submit(cache.get_or_create, key, create)
+
+
+def _submit(task: SceneTask) -> Future:
+    """Encode one scene to task.output with the configured backend."""
+    if RENDER_BACKEND != "parallel":
+        return _run_now(encode_scene, task)
+    threads = max(1, (os.cpu_count() or 1) // max(1, RENDER_FARM_WORKERS))
+    return _get_pool().submit(encode_scene, task._replace(threads=threads))
+
+
+def shutdown() -> None:
+    """Stop the worker pool."""
+    global _pool, _dispatcher
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+        if _dispatcher is not None:
+            _dispatcher.shutdown(wait=False, cancel_futures=True)
+            _dispatcher = None
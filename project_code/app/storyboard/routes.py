@@ -1,46 +1,145 @@
-from typing import Union
-from fastapi import APIRouter
-from utils.response_models import SuccessResponse,ErrorResponse
-from utils.query_helpers import QueryHelper
-from storyboard.models import StoryBoard
-from storyboard.services import generate_storyboard_video
+from typing import Optional, Union
+from fastapi import APIRouter, Header, Query
+from fastapi.responses import StreamingResponse
+from utils.response_models import SuccessResponse,ErrorResponse,PaginatedSuccessResponse
+from utils.async_query_helpers import AsyncQueryHelper
+from storyboard.models import StoryBoard, BatchStoryBoard
+from storyboard.jobs import job_manager
+from storyboard.progress import event_stream
+from utils.export import ndjson_export
 router = APIRouter()
 
 @router.post("/generate", response_model=Union[SuccessResponse, ErrorResponse])
 async def generate_storyboard_endpoint(storyboard:StoryBoard):
-    name = storyboard.username
-    story = storyboard.story
-    link = generate_storyboard_video(storyboard.story)
-    QueryHelper.insert_one(
-        "storyboards",
-        {
-            "story": story,
-            "username": name,
-            "video": link.replace("frontend/",""),
-        }
+    """
+    Queue a storyboard render and return its job id right away.
+
+    With stream set, the job also carries an HLS playlist that can be played while the render runs.
+    """
+    job = job_manager.submit(storyboard.username, storyboard.story, storyboard.settings, storyboard.stream)
+    if isinstance(job, ErrorResponse):
+        return job
+    return SuccessResponse(
+        success=True,
+        data=job,
+        message="Storyboard generation queued",
+        code=202,
     )
+
+@router.post("/generate_batch", response_model=Union[SuccessResponse, ErrorResponse])
+async def generate_storyboard_batch_endpoint(batch: BatchStoryBoard):
+    """
+    Queue a batch of stories as one render job and return its job id right away.
+
+    Per-story results and overall timing are reported by the job once it finishes.
+    """
+    stories = [story for story in batch.stories if story.strip()]
+    if not stories:
+        return ErrorResponse(
+            success=False,
+            errors=[{"message": "No stories to generate"}],
+            code=400,
+        )
+    job = job_manager.submit_batch(batch.username, stories, batch.settings)
+    if isinstance(job, ErrorResponse):
+        return job
+    return SuccessResponse(
+        success=True,
+        data=job,
+        message="Storyboard batch generation queued",
+        code=202,
+    )
+
+@router.get("/jobs/{job_id}", response_model=Union[SuccessResponse, ErrorResponse])
+async def get_job_endpoint(job_id: str):
+    """
+    Report the status of a render job, and its result once it has finished.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return ErrorResponse(
+            success=False,
+            errors=[{"message": "Job not found"}],
+            code=404,
+        )
     return SuccessResponse(
         success=True,
-        data={"username": name, "story": story, "video": link},
-        message="Storyboard generated successfully",
-        code=201,
+        data=job,
+        message="Job retrieved successfully",
+        code=200,
+    )
+
+@router.get("/jobs/{job_id}/events")
+async def job_events_endpoint(job_id: str, last_event_id: Optional[int] = Header(None)):
+    """
+    Stream a render job's progress as server-sent events until it is done or has failed.
+
+    The final "done" event carries the video and the saved storyboard. Reconnecting clients
+    send Last-Event-ID and only receive the events they missed.
+    """
+    if job_manager.get(job_id) is None:
+        return ErrorResponse(
+            success=False,
+            errors=[{"message": "Job not found"}],
+            code=404,
+        )
+    return StreamingResponse(
+        event_stream(job_manager.progress, job_id, -1 if last_event_id is None else last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/jobs", response_model=Union[SuccessResponse, ErrorResponse])
+async def list_jobs_endpoint(username: str):
+    """
+    List the render jobs of a user, newest first.
+    """
+    return SuccessResponse(
+        success=True,
+        data=job_manager.list_jobs(username),
+        message="Jobs retrieved successfully",
+        code=200,
+    )
+
+@router.get("/export")
+async def export_storyboards(username: str):
+    """
+    Export a user's storyboards as newline-delimited JSON, streamed with constant memory.
+    """
+    return ndjson_export(
+        "storyboards",
+        {"username": username},
+        f"storyboards_{username}.ndjson",
+        sort=[("created_on", -1), ("_id", -1)],
     )
 
-@router.get("/get_storyboards", response_model=Union[SuccessResponse, ErrorResponse])
-async def get_storyboard_endpoint(username: str):
-    results = QueryHelper.find(
+@router.get("/get_storyboards", response_model=Union[PaginatedSuccessResponse, ErrorResponse])
+async def get_storyboard_endpoint(username: str, limit: int = Query(10, ge=1, le=100), cursor: Optional[str] = None):
+    """
+    List a user's storyboards, newest first. Pass the returned next_cursor to get the next page.
+    """
+    page = await AsyncQueryHelper.find_page(
         "storyboards",
         {
             "username": username
-        }
+        },
+        limit=limit,
+        cursor=cursor,
+        projection={"story": 1, "username": 1, "video": 1, "created_on": 1},
     )
-    if results:
-        return SuccessResponse(
+    if isinstance(page, ErrorResponse):
+        return page
+    if page["data"] or cursor:
+        return PaginatedSuccessResponse(
             success=True,
-            data=results,
+            data=page["data"],
+            pagination={"size": limit, "next_cursor": page["next_cursor"], "has_more": page["has_more"]},
             code =200,
             message="Storyboards retrieved successfully"
             )
     else:
-        return ErrorResponse(message="No storyboard found for this user.")
-    
\ No newline at end of file
+        return ErrorResponse(
+            message="No storyboard found for this user.",
+            errors=[{"message": "No storyboard found for this user."}],
+            code=404,
+        )
@@ -0,0 +1,292 @@
+import os
+import re
+import json
+import zlib
+import fcntl
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Set SEMANTIC_BACKGROUNDS=1 to reuse the background of a similar earlier sentence
+SEMANTIC_BACKGROUNDS = os.getenv("SEMANTIC_BACKGROUNDS", "0") == "1"
+# Embedder used for sentences: "tfidf" works offline, "sentence-transformers" needs
+# requirements-ml.txt installed and the model
+SEMANTIC_EMBEDDER = os.getenv("SEMANTIC_EMBEDDER", "tfidf")
+# Model loaded by the sentence-transformers embedder
+SEMANTIC_MODEL = os.getenv("SEMANTIC_MODEL", "all-MiniLM-L6-v2")
+# Minimum cosine similarity for reuse; empty uses the embedder's default
+SEMANTIC_THRESHOLD = os.getenv("SEMANTIC_THRESHOLD", "")
+# Directory of the persistent vector index, one subdirectory per embedder
+SEMANTIC_INDEX_DIR = os.getenv("SEMANTIC_INDEX_DIR", "cache/semantic")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have he her his in is it its of on or she that the their "
+    "them they this to was were will with".split()
+)
+
+
+class TfidfEmbedder:
+    """
+    Offline embedder over hashed word unigrams and bigrams.
+
+    Words are lower-cased, stripped of stopwords and crudely stemmed, then
+    hashed into a fixed number of dimensions with sublinear term frequency.
+    The index applies inverse document frequencies learned from the
+    sentences it holds, so no vocabulary has to be fitted up front.
+    """
+
+    name = "tfidf"
+    default_threshold = 0.5
+    uses_idf = True
+
+    def __init__(self, dimensions: int = 2048):
+        self.dimensions = dimensions
+
+    @staticmethod
+    def _stem(word: str) -> str:
+        for suffix in ("ing", "ed", "es", "s"):
+            if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+                word = word[: -len(suffix)]
+                break
+        # "running" -> "runn" -> "run"
+        if len(word) > 3 and word[-1] == word[-2] and word[-1] not in "aeiouls":
+            word = word[:-1]
+        return word
+
+    def _features(self, text: str) -> List[str]:
+        words = [self._stem(w) for w in re.findall(r"[a-z0-9']+", text.lower()) if w not in STOPWORDS]
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                vectors[row, zlib.crc32(feature.encode()) % self.dimensions] += 1.0
+        # Sublinear term frequency keeps repeated words from dominating
+        np.log1p(vectors, out=vectors)
+        return vectors
+
+
+class SentenceTransformerEmbedder:
+    """Embedder backed by a sentence-transformers model, loaded on first use."""
+
+    name = "sentence-transformers"
+    default_threshold = 0.75
+    uses_idf = False
+
+    def __init__(self, model: str = SEMANTIC_MODEL):
+        self.model_name = model
+        self._model = None
+        self._lock = threading.Lock()
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        with self._lock:
+            if self._model is None:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                except ImportError as e:
+                    raise ImportError(
+                        "SEMANTIC_EMBEDDER=sentence-transformers needs requirements-ml.txt installed"
+                    ) from e
+                self._model = SentenceTransformer(self.model_name)
+        return np.asarray(self._model.encode(texts, normalize_embeddings=True), dtype=np.float32)
+
+
+# Embedder factories by name; register_embedder adds more
+EMBEDDERS: Dict[str, Callable[[], object]] = {
+    TfidfEmbedder.name: TfidfEmbedder,
+    SentenceTransformerEmbedder.name: SentenceTransformerEmbedder,
+}
+
+
+def register_embedder(name: str, factory: Callable[[], object]) -> None:
+    """
+    Make an embedder selectable through SEMANTIC_EMBEDDER.
+
+    The embedder needs a name, a default_threshold, a uses_idf flag and an
+    embed(texts) method returning one float32 row per text.
+
+    Args:
+        name: Value of SEMANTIC_EMBEDDER selecting the embedder
+        factory: Called without arguments to create the embedder
+    """
+    EMBEDDERS[name] = factory
+
+
+class SemanticIndex:
+    """
+    A persistent nearest-neighbour index from sentences to background images.
+
+    Vectors are appended to a raw float32 file and their sentences, image
+    paths and row numbers to a JSON-lines file, under a file lock so several
+    processes can share one index. Entries point at their row explicitly, so
+    a write interrupted between the two files leaves an unused row or a torn
+    line that is skipped, never a misaligned index. Each process keeps the
+    matrix in memory and reads rows appended by other processes before
+    searching. Search is an exact cosine
+    similarity scan, which is fast enough for tens of thousands of sentences.
+    """
+
+    def __init__(self, directory: str, embedder, threshold: Optional[float] = None):
+        self.embedder = embedder
+        self.threshold = embedder.default_threshold if threshold is None else threshold
+        self.directory = os.path.join(directory, embedder.name)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: List[Dict[str, str]] = []
+        self._buffer = np.zeros((0, 0), dtype=np.float32)
+        self._document_frequency = None
+        self._offset = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self._entries_path = os.path.join(self.directory, "entries.jsonl")
+        self._vectors_path = os.path.join(self.directory, "vectors.f32")
+        self._lock_path = os.path.join(self.directory, "index.lock")
+
+    def _file_lock(self, mode: int):
+        handle = open(self._lock_path, "a")
+        fcntl.flock(handle, mode)
+        return handle
+
+    def _refresh(self, dimensions: int) -> None:
+        """
+        Load entries appended since the last refresh, by this or another process.
+
+        Args:
+            dimensions: Length of the embedder's vectors
+        """
+        if not os.path.exists(self._entries_path) or os.path.getsize(self._entries_path) == self._offset:
+            return
+        with self._file_lock(fcntl.LOCK_SH):
+            with open(self._entries_path, "rb") as f:
+                f.seek(self._offset)
+                data = f.read()
+            # A line is only complete once its newline is written
+            data = data[: data.rfind(b"\n") + 1]
+            self._offset += len(data)
+            stored_rows = os.path.getsize(self._vectors_path) // (4 * dimensions)
+            new_entries = []
+            for line in data.splitlines():
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Torn line of an interrupted write
+                    continue
+                if entry["row"] < stored_rows:
+                    new_entries.append(entry)
+            if not new_entries:
+                return
+            # Only the rows of the new entries are read
+            stored = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(stored_rows, dimensions))
+            vectors = np.array(stored[[entry["row"] for entry in new_entries]])
+            del stored
+        rows = len(self._entries) + len(new_entries)
+        if rows > len(self._buffer):
+            # Capacity doubles so appending one row at a time stays amortized O(1)
+            buffer = np.zeros((max(rows, 2 * len(self._buffer), 64), dimensions), dtype=np.float32)
+            if self._entries:
+                buffer[: len(self._entries)] = self._buffer[: len(self._entries)]
+            self._buffer = buffer
+        self._buffer[len(self._entries): rows] = vectors
+        self._entries.extend(new_entries)
+        frequency = np.count_nonzero(vectors, axis=0)
+        self._document_frequency = frequency if self._document_frequency is None else self._document_frequency + frequency
+
+    def _similarities(self, vector: np.ndarray) -> np.ndarray:
+        """Cosine similarity of vector to every indexed sentence."""
+        matrix = self._buffer[: len(self._entries)]
+        if self.embedder.uses_idf:
+            # Inverse document frequency over the indexed sentences, smoothed as in scikit-learn
+            weights = (np.log((1 + len(matrix)) / (1 + self._document_frequency)) + 1).astype(np.float32) ** 2
+        else:
+            weights = np.ones(matrix.shape[1], dtype=np.float32)
+        # Weighted dot products and norms without materializing a weighted copy of the matrix
+        dots = matrix @ (vector * weights)
+        norms = np.sqrt(np.einsum("ij,ij,j->i", matrix, matrix, weights)) * np.sqrt(vector @ (vector * weights))
+        return dots / np.where(norms == 0, 1.0, norms)
+
+    def nearest(self, sentence: str) -> Optional[Tuple[str, float]]:
+        """
+        Find the background of the most similar indexed sentence.
+
+        Args:
+            sentence: Sentence needing a background
+
+        Returns:
+            (image path, similarity) if one scores at least the threshold and its image still exists, else None
+        """
+        vector = self.embedder.embed([sentence])[0]
+        with self._lock:
+            self._refresh(len(vector))
+            if not self._entries:
+                self.misses += 1
+                return None
+            scores = self._similarities(vector)
+            for row in np.argsort(-scores)[:5]:
+                if scores[row] < self.threshold:
+                    break
+                image = self._entries[row]["image"]
+                if os.path.exists(image):
+                    self.hits += 1
+                    return image, float(scores[row])
+            self.misses += 1
+            return None
+
+    def add(self, sentence: str, image: str) -> None:
+        """
+        Index the background generated for a sentence.
+
+        Args:
+            sentence: Sentence the image was generated for
+            image: Path of the image
+        """
+        vector = self.embedder.embed([sentence])[0].astype(np.float32)
+        with self._lock:
+            with self._file_lock(fcntl.LOCK_EX):
+                with open(self._vectors_path, "ab") as f:
+                    size = f.seek(0, os.SEEK_END)
+                    # A partially written row is cut off so every row starts at a multiple of the row size
+                    if size % vector.nbytes:
+                        size -= size % vector.nbytes
+                        f.truncate(size)
+                    f.write(vector.tobytes())
+                # The entry is written last and names its row, so an interrupted add leaves only an unused row
+                line = json.dumps({"sentence": sentence, "image": image, "row": size // vector.nbytes}) + "\n"
+                with open(self._entries_path, "a+b") as f:
+                    end = f.seek(0, os.SEEK_END)
+                    if end:
+                        f.seek(end - 1)
+                        if f.read(1) != b"\n":
+                            # Terminate a torn line so it is skipped instead of swallowing this entry
+                            line = "\n" + line
+                    f.write(line.encode())
+            self._refresh(len(vector))
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit and miss counters and the number of indexed sentences."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+_index: Optional[SemanticIndex] = None
+_index_lock = threading.Lock()
+
+
+def semantic_index() -> Optional[SemanticIndex]:
+    """
+    Return the shared index, or None if SEMANTIC_BACKGROUNDS is off.
+
+    Raises:
+        ValueError: If SEMANTIC_EMBEDDER names no registered embedder
+    """
+    global _index
+    if not SEMANTIC_BACKGROUNDS:
+        return None
+    with _index_lock:
+        if _index is None:
+            if SEMANTIC_EMBEDDER not in EMBEDDERS:
+                raise ValueError(f"Unknown SEMANTIC_EMBEDDER '{SEMANTIC_EMBEDDER}'")
+            threshold = float(SEMANTIC_THRESHOLD) if SEMANTIC_THRESHOLD else None
+            _index = SemanticIndex(SEMANTIC_INDEX_DIR, EMBEDDERS[SEMANTIC_EMBEDDER](), threshold)
+        return _index
@@ -1,33 +1,83 @@
 import os
-import requests
+import time
+import uuid
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import hashlib
 import openai
 from gtts import gTTS
-from moviepy.editor import TextClip, AudioFileClip, CompositeVideoClip, concatenate_audioclips, ImageClip
+from moviepy.editor import AudioFileClip
+from proglog import ProgressBarLogger
 from config import OPENAI_API_KEY  # Replace with your OpenAI API key import or set inline
-from PIL import Image, ImageEnhance
+from storyboard.models import RenderSettings
+from storyboard.encoder import concat_segments, concat_audio
+from storyboard.render_farm import SceneTask, submit_scene, scene_frame
+from storyboard.providers import PROVIDER_SLOW_SECONDS, generate_image, download, speech
+from storyboard.semantic import semantic_index
+from storyboard.streaming import HlsPlaylist
+from storyboard.timeline import SequentialTimeline
+from storyboard.cache import (
+    render_cache_key, video_path_for, stream_path_for, prune_streams, cached_video, audio_cache, audio_cache_key,
+    segment_cache, segment_cache_key, link_or_copy,
+)
+from utils.metrics import metrics
+from utils.singleflight import SingleFlight
 
-# Function to darken the image
-def darken_image(image_path):
+# Stories of a batch rendered at the same time
+BATCH_STORY_CONCURRENCY = int(os.getenv("BATCH_STORY_CONCURRENCY", "4"))
+# Maximum number of sentences whose audio and background are generated at the same time
+ASSET_CONCURRENCY = int(os.getenv("ASSET_CONCURRENCY", "8"))
+
+# "still" encodes each scene as one held frame, "moviepy" streams every frame through MoviePy
+RENDER_ENCODER = os.getenv("RENDER_ENCODER", "still")
+
+# Whole renders, and stages whose cost grows with the story, slower than this many seconds are logged as slow
+SLOW_RENDER_SECONDS = float(os.getenv("SLOW_RENDER_SECONDS", "120"))
+
+# Background used when image generation fails; a missing file renders as black
+FALLBACK_IMAGE = "fallback_image.png"  # Replace with an actual fallback image path
+
+# Coalesces concurrent renders of the same story and settings
+_render_flight = SingleFlight()
+# Coalesces concurrent generation of the same background image
+_image_flight = SingleFlight()
+
+def report(progress, stage, **fields):
     """
-    Darkens the image by adjusting its brightness.
-    
+    Send a progress event to a render's listener, if it has one.
+
+    A failing listener never fails the render.
+
     Args:
-        image_path (str): Path to the image to be darkened.
-    
-    Returns:
-        str: Path to the darkened image.
+        progress (callable): Listener called with the event dict, or None.
+        stage (str): Pipeline stage the event describes.
+        **fields: Details of the event.
     """
+    if progress is None:
+        return
     try:
-        img = Image.open(image_path)
-        enhancer = ImageEnhance.Brightness(img)
-        img = enhancer.enhance(0.4)  # Reduce brightness to make the image darker
-        darkened_image_path = image_path.replace(".png", "_darkened.png")
-        img.save(darkened_image_path)
-        return darkened_image_path
+        progress({"stage": stage, **fields})
     except Exception as e:
-        print(f"Error darkening image: {e}")
-        return image_path
+        print(f"Progress listener failed: {e}")
+
+class _EncodingProgress(ProgressBarLogger):
+    """MoviePy logger that reports frame-writing progress as whole percentages."""
+
+    def __init__(self, progress):
+        super().__init__()
+        self.progress = progress
+        self.percent = -1
+
+    def bars_callback(self, bar, attr, value, old_value=None):
+        # MoviePy iterates video frames over the "t" bar
+        if bar != "t" or attr != "index" or not self.bars[bar]["total"]:
+            return
+        percent = int(100 * (value + 1) / self.bars[bar]["total"])
+        if percent != self.percent:
+            self.percent = percent
+            report(self.progress, "encoding", percent=min(percent, 100))
 
 # Function to generate custom background image using OpenAI's API
 def get_custom_background_image(sentence):
@@ -50,50 +100,233 @@ def get_custom_background_image(sentence):
     image_filename = f"background_{hash_object.hexdigest()[:8]}.png"
     image_path = os.path.join(output_directory, image_filename)
 
+    # Identical sentences generated at the same time share one request
+    return _image_flight.do(image_path, _fetch_background_image, sentence, image_path)[0]
+
+def _fetch_background_image(sentence, image_path):
+    """
+    Fetch the background image for a sentence into image_path unless it already exists.
+
+    Args:
+        sentence (str): The input sentence.
+        image_path (str): Where the image is cached.
+
+    Returns:
+        str: The path to the image, or None if generation failed.
+    """
     # Check if the image already exists to avoid regenerating
     if os.path.exists(image_path):
-        return darken_image(image_path)  # Apply darkening if the image exists
+        return image_path
+
+    # A background generated for a similar sentence is reused instead of generating a new one,
+    # and linked to this sentence's path so later renders of it find it without a search
+    similar_image = _similar_background(sentence)
+    if similar_image:
+        try:
+            return link_or_copy(similar_image, image_path)
+        except OSError as e:
+            print(f"Could not link reused background {similar_image}: {e}")
+            return similar_image
 
     try:
         # Set up OpenAI API
         openai.api_key = OPENAI_API_KEY
 
         # Generate the image using OpenAI API
-        response = openai.Image.create(
-            prompt="Give me an image of " + sentence,
-            n=1,
-            size="512x512"
-        )
+        with metrics.span("render_stage", slow_after=PROVIDER_SLOW_SECONDS, stage="image_generate"):
+            image_url = generate_image("Give me an image of " + sentence, size="512x512")
 
-        # Fetch the generated image URL from the response
-        image_url = response["data"][0]["url"]
-        response_image = requests.get(image_url)
+        # Fetch the generated image
+        with metrics.span("render_stage", slow_after=PROVIDER_SLOW_SECONDS, stage="image_download"):
+            image = download(image_url)
 
-        if response_image.status_code == 200:
-            # Save the image locally
-            with open(image_path, "wb") as f:
-                f.write(response_image.content)
-            return darken_image(image_path)  # Darken the image after saving it
-        else:
-            raise Exception(f"Failed to fetch image: {response_image.status_code}")
+        # Save the image locally
+        with open(image_path, "wb") as f:
+            f.write(image)
+        _index_background(sentence, image_path)
+        return image_path
 
     except Exception as e:
         print(f"Error generating image: {e}")
         return None
 
+def _similar_background(sentence):
+    """
+    Look up the background of the most similar earlier sentence in the semantic index.
+
+    Args:
+        sentence (str): The input sentence.
+
+    Returns:
+        str: The path to the reused image, or None if semantic reuse is off or nothing is similar enough.
+    """
+    try:
+        index = semantic_index()
+        match = index.nearest(sentence) if index else None
+    except Exception as e:
+        print(f"Semantic background lookup failed: {e}")
+        return None
+    if index:
+        metrics.increment("semantic_background_lookups_total", result="hit" if match else "miss")
+    if not match:
+        return None
+    image, similarity = match
+    print(f"Reusing background {image} (similarity {similarity:.2f}) for sentence: {sentence}")
+    return image
+
+def _index_background(sentence, image_path):
+    """Add a newly generated background to the semantic index, if semantic reuse is on."""
+    try:
+        index = semantic_index()
+        if index:
+            index.add(sentence, image_path)
+    except Exception as e:
+        print(f"Semantic background indexing failed: {e}")
+
+def _generate_sentence_assets(i, sentence, settings, workdir, progress=None):
+    """
+    Generate the narration audio and background image of one sentence.
+
+    Narration comes from the persistent audio cache, synthesizing it only on a miss, and is
+    linked into the request's own working directory.
+
+    Args:
+        i (int): Index of the sentence in the story.
+        sentence (str): The sentence.
+        settings (RenderSettings): Render parameters.
+        workdir (str): Directory private to this render.
+        progress (callable): Receives an "audio" and an "image" event for the sentence.
+
+    Returns:
+        tuple: (audio file, audio duration, background image path), or None if the sentence is skipped.
+    """
+    def synthesize(path):
+        with metrics.span("render_stage", slow_after=PROVIDER_SLOW_SECONDS, stage="tts"):
+            speech.call(lambda: gTTS(sentence, lang=settings.lang, tld=settings.tld, timeout=speech.timeout).save(path))
+
+    try:
+        # Generate audio for each valid sentence
+        key = audio_cache_key(sentence, settings.lang, settings.tld)
+        cached_audio = audio_cache().get_or_create(key, synthesize)
+        audio_file = link_or_copy(cached_audio, os.path.join(workdir, f"audio_{i}.mp3"))
+
+        # Get the duration of the audio
+        with metrics.span("render_stage", stage="audio_probe"):
+            audio_clip = AudioFileClip(audio_file)
+            duration = audio_clip.duration
+            audio_clip.close()
+        report(progress, "audio", sentence=i)
+
+        # Generate or fetch a custom background image
+        background_image = get_custom_background_image(sentence)
+        if not background_image:
+            # Use a fallback image or black background if image generation fails
+            print(f"Image generation failed for sentence: {sentence}")
+            metrics.increment("render_fallback_images_total")
+            background_image = FALLBACK_IMAGE
+        report(progress, "image", sentence=i, fallback=background_image == FALLBACK_IMAGE)
+        return audio_file, duration, background_image
+    except Exception as e:
+        print(f"Skipping sentence {i}: '{sentence}' due to error - {e}")
+        metrics.increment("render_skipped_sentences_total")
+        report(progress, "skipped", sentence=i, error=str(e))
+        return None
+
+def generate_sentence_assets(sentences, settings, workdir, concurrency=None, progress=None):
+    """
+    Generate the audio and background of every sentence concurrently.
+
+    Args:
+        sentences (list): Sentences of the story.
+        settings (RenderSettings): Render parameters.
+        workdir (str): Directory private to this render.
+        concurrency (int): Sentences processed at the same time. Defaults to ASSET_CONCURRENCY.
+        progress (callable): Receives per-sentence asset events.
+
+    Returns:
+        list: One entry per sentence, in sentence order, as returned by _generate_sentence_assets.
+    """
+    return list(iter_sentence_assets(sentences, settings, workdir, concurrency, progress))
+
+def iter_sentence_assets(sentences, settings, workdir, concurrency=None, progress=None):
+    """
+    Generate the audio and background of every sentence concurrently, yielding them in order.
+
+    Each entry is yielded as soon as it and every earlier sentence are ready, so callers can
+    start on the first scenes while later ones are still being generated.
+
+    Args:
+        sentences (list): Sentences of the story.
+        settings (RenderSettings): Render parameters.
+        workdir (str): Directory private to this render.
+        concurrency (int): Sentences processed at the same time. Defaults to ASSET_CONCURRENCY.
+        progress (callable): Receives per-sentence asset events.
+
+    Yields:
+        tuple: One entry per sentence, in sentence order, as returned by _generate_sentence_assets.
+    """
+    workers = max(1, min(concurrency or ASSET_CONCURRENCY, len(sentences) or 1))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="assets") as pool:
+        yield from pool.map(lambda args: _generate_sentence_assets(*args, settings, workdir, progress), enumerate(sentences))
+
+def split_sentences(text):
+    """
+    Split text into sentences and filter out empty strings.
+    Args:
+        text (str): The input text.
+    Returns:
+        list: Sentences, each ending with a period.
+    """
+    sentences = text.split(".")
+    return [sentence.strip() + ("." if not sentence.endswith(".") else "") for sentence in sentences if sentence.strip()]
+
 # Function to generate video with OpenAI-generated images
-def generate_sentence_by_sentence_video(text, output_filename="output_sentence_by_sentence.mp4"):
+def generate_sentence_by_sentence_video(text, output_filename="output_sentence_by_sentence.mp4", settings=None, concurrency=None, on_segment=None, progress=None):
     """
     Generate a video with text appearing sentence by sentence and synchronized with audio narration,
     each with a custom background image.
     Args:
         text (str): The input text.
         output_filename (str): The output video file.
+        settings (RenderSettings): Output size, frame rate and voice. Defaults to RenderSettings().
+        concurrency (int): Sentences processed at the same time. Defaults to ASSET_CONCURRENCY.
+        on_segment (callable): Called with each playable MP4 segment, in playback order, as soon as it is ready.
+        progress (callable): Called with a dict for every pipeline step: "started", per-sentence "audio",
+            "image" and "skipped", "scene" or "encoding" with a percentage, and "joining".
+    Returns:
+        dict: Segment counts of the render, or None if no sentence could be rendered.
     """
-    # Split text into sentences and filter out empty strings
-    sentences = text.split(".")
-    sentences = [sentence.strip() + ("." if not sentence.endswith(".") else "") for sentence in sentences if sentence.strip()]
+    settings = settings or RenderSettings()
+    sentences = split_sentences(text)
     print(sentences)
+    report(progress, "started", sentences=len(sentences))
+
+    # Every intermediate file of this render lives in its own directory
+    workdir = tempfile.mkdtemp(prefix="storyboard_")
+    try:
+        return _render_sentences(sentences, output_filename, settings, workdir, concurrency, on_segment, progress)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def _render_sentences(sentences, output_filename, settings, workdir, concurrency, on_segment=None, progress=None):
+    """
+    Generate the assets of every sentence and compose them into output_filename.
+    Args:
+        sentences (list): Sentences of the story.
+        output_filename (str): The output video file.
+        settings (RenderSettings): Render parameters.
+        workdir (str): Directory private to this render.
+        concurrency (int): Sentences processed at the same time.
+        on_segment (callable): Called with each playable MP4 segment, in playback order.
+        progress (callable): Receives progress events.
+    Returns:
+        dict: Segment counts of the render, or None if no sentence could be rendered.
+    """
+    if RENDER_ENCODER == "still":
+        return _encode_still_scenes(sentences, output_filename, settings, workdir, concurrency, on_segment, progress)
+
+    # Generate the audio and background of every sentence concurrently, keeping sentence order
+    assets = generate_sentence_assets(sentences, settings, workdir, concurrency, progress)
 
     # Initialize lists for audio files, durations, and valid sentences
     audio_files = []
@@ -101,90 +334,311 @@ def generate_sentence_by_sentence_video(text, output_filename="output_sentence_b
     valid_sentences = []
     background_images = []
 
-    for i, sentence in enumerate(sentences):
-        try:
-            # Generate audio for each valid sentence
-            tts = gTTS(sentence)
-            audio_file = f"audio_{i}.mp3"
-            tts.save(audio_file)
-            audio_files.append(audio_file)
-
-            # Get the duration of the audio
-            audio_clip = AudioFileClip(audio_file)
-            sentence_durations.append(audio_clip.duration)
-            valid_sentences.append(sentence)  # Only include valid sentences
-            audio_clip.close()
-
-            # Generate or fetch a custom background image
-            background_image = get_custom_background_image(sentence)
-            if background_image:
-                background_images.append(background_image)
-            else:
-                # Use a fallback image or black background if image generation fails
-                print(f"Image generation failed for sentence: {sentence}")
-                background_images.append("fallback_image.png")  # Replace with an actual fallback image path
-        except Exception as e:
-            print(f"Skipping sentence {i}: '{sentence}' due to error - {e}")
+    for sentence, asset in zip(sentences, assets):
+        if asset is None:
+            continue
+        audio_file, duration, background_image = asset
+        audio_files.append(audio_file)
+        sentence_durations.append(duration)
+        valid_sentences.append(sentence)  # Only include valid sentences
+        background_images.append(background_image)
 
     # If no valid audio generated, exit gracefully
     if not audio_files:
         print("No valid sentences to process. Exiting.")
-        return
+        return None
+
+    _compose_with_moviepy(valid_sentences, audio_files, sentence_durations, background_images, output_filename, settings, workdir, progress)
+    # MoviePy writes the video in one pass, so it is published as a single segment
+    if on_segment:
+        on_segment(output_filename)
+    return {"segments_total": 0, "segments_reused": 0}
+
+def _encode_still_scenes(sentences, output_filename, settings, workdir, concurrency, on_segment=None, progress=None):
+    """
+    Encode every scene as a cached segment, then join the segments with a stream copy.
+
+    Each scene is a static background plus a static caption, so it is flattened to one frame
+    and encoded as a held frame with its narration. Segments are cached by sentence and render
+    settings, so an edited story only generates assets for, and encodes, the scenes that changed.
+    Missing scenes are encoded by the render farm backend (serial or parallel) as soon as their
+    assets are ready, and finished scenes are handed to on_segment in playback order.
+    Returns:
+        dict: Segment counts of the render, or None if no sentence could be rendered.
+    """
+    size = (settings.width, settings.height)
+    keys = [segment_cache_key(sentence, settings) for sentence in sentences]
+
+    # Private links keep segments readable even if the cache evicts them mid-render
+    def claim(i, path):
+        return link_or_copy(path, os.path.join(workdir, f"segment_{i}.mp4"))
+
+    segments = []
+    for i, key in enumerate(keys):
+        cached_segment = segment_cache().get(key)
+        segments.append(claim(i, cached_segment) if cached_segment else None)
+    missing = [i for i, segment in enumerate(segments) if segment is None]
+    reused = len(sentences) - len(missing)
+
+    missing_set = set(missing)
+    # Progress of the assets is reported against the sentence's position in the story
+    asset_progress = (lambda event: report(progress, **{**event, "sentence": missing[event["sentence"]]})) if progress else None
+
+    # A scene is settled once its segment exists or its sentence was skipped
+    settled = [segment is not None for segment in segments]
+    encoding = {}
+    published = 0
+
+    def publish(block):
+        # Hand over the longest run of settled scenes that follows the last one published
+        nonlocal published
+        while published < len(sentences):
+            i = published
+            if i in encoding:
+                future, background_image = encoding[i]
+                if not block and not future.done():
+                    return
+                segment = future.result()
+                del encoding[i]
+                settled[i] = True
+                # Cached segments are claimed like cache hits; fallback scenes were encoded privately
+                segments[i] = claim(i, segment) if background_image != FALLBACK_IMAGE else segment
+            elif not settled[i]:
+                return
+            if segments[i] and on_segment:
+                on_segment(segments[i])
+            published += 1
+            report(
+                progress, "scene", sentence=i, cached=i not in missing_set, rendered=bool(segments[i]),
+                percent=int(100 * published / len(sentences)),
+            )
 
-    # Calculate the start times for each sentence
-    start_times = [0] + [sum(sentence_durations[:i + 1]) for i in range(len(sentence_durations) - 1)]
+    publish(block=False)
+    # Only scenes missing from the cache need narration and a background
+    assets = iter_sentence_assets([sentences[i] for i in missing], settings, workdir, concurrency, asset_progress)
+    for i, asset in zip(missing, assets):
+        if asset is None:
+            settled[i] = True
+        else:
+            audio_file, duration, background_image = asset
+            task = SceneTask(
+                background_image=os.path.abspath(background_image),
+                sentence=sentences[i],
+                size=size,
+                audio_file=os.path.abspath(audio_file),
+                duration=duration,
+                fps=settings.fps,
+                output=os.path.abspath(os.path.join(workdir, f"scene_{i}.mp4")),
+            )
+            # Scenes on the fallback image are not cached, so a later render can pick up the real background
+            if background_image != FALLBACK_IMAGE:
+                future = submit_scene(task, segment_cache(), keys[i])
+            else:
+                future = submit_scene(task)
+            encoding[i] = (future, background_image)
+        publish(block=False)
+    publish(block=True)
 
-    # Create a list of TextClip objects, one for each valid sentence
-    clips = []
+    segments = [segment for segment in segments if segment]
+    if not segments:
+        print("No valid sentences to process. Exiting.")
+        return None
 
-    for i, sentence in enumerate(valid_sentences):
-        # Create an ImageClip for the background
-        bg_clip = ImageClip(background_images[i], duration=sentence_durations[i])
-        bg_clip = bg_clip.set_position(("center", "center"))
+    report(progress, "joining")
+    with metrics.span("render_stage", slow_after=SLOW_RENDER_SECONDS, stage="concat"):
+        concat_segments(segments, output_filename, workdir)
+    return {"segments_total": len(segments), "segments_reused": reused}
 
-        # Create a TextClip for the sentence
-        text_clip = TextClip(sentence, fontsize=25, color='white', size=(512, 512), method="caption")
-        text_clip = text_clip.set_position(("center", "bottom")).set_duration(sentence_durations[i])
+def _compose_with_moviepy(valid_sentences, audio_files, sentence_durations, background_images, output_filename, settings, workdir, progress=None):
+    """
+    Stream the scenes through a sequential MoviePy timeline and write the video frame by frame.
 
-        # Overlay the text on the background image
-        final_clip = CompositeVideoClip([bg_clip, text_clip]).set_start(start_times[i])
-        clips.append(final_clip)
+    Only the active scene and the next one are held in memory, and each frame is looked up
+    with a binary search instead of evaluating a composite of every scene.
+    """
+    size = (settings.width, settings.height)
 
-    # Combine all video clips into a single video
-    video = CompositeVideoClip(clips, size=(512, 512))
+    # Scene frames are built lazily by the timeline, one scene at a time
+    scenes = [
+        partial(scene_frame, background_images[i], sentence, size)
+        for i, sentence in enumerate(valid_sentences)
+    ]
+    video = SequentialTimeline(scenes, sentence_durations, size).clip()
 
-    # Combine all audio files into a single AudioFileClip
-    audio_clips = [AudioFileClip(audio_file) for audio_file in audio_files]
-    combined_audio = concatenate_audioclips(audio_clips)
+    # Join the narration into a single file so only one audio reader is open
+    with metrics.span("render_stage", slow_after=SLOW_RENDER_SECONDS, stage="concat_audio"):
+        combined_audio = AudioFileClip(concat_audio(audio_files, os.path.join(workdir, "narration.mp3"), workdir))
 
     # Add the combined audio to the video
     video = video.set_audio(combined_audio)
 
     # Write the final video to file
-    video.write_videofile(output_filename, fps=24)
+    with metrics.span("render_stage", slow_after=SLOW_RENDER_SECONDS, stage="moviepy_write"):
+        video.write_videofile(
+            output_filename,
+            fps=settings.fps,
+            temp_audiofile=os.path.join(workdir, "temp_audio.mp3"),
+            logger=_EncodingProgress(progress) if progress else "bar",
+        )
 
     # Cleanup
-    for audio_file in audio_files:
-        os.remove(audio_file)
+    combined_audio.close()
 
 # Wrapper function as requested
-def generate_storyboard_video(text):
+def generate_storyboard_video(text, settings=None):
     """
     Wrapper to generate a storyboard video from input text, storing it in generated_videos and returning its path.
     Args:
         text (str): Input story text (sentences separated by periods).
+        settings (RenderSettings): Output size, frame rate and voice. Defaults to RenderSettings().
     Returns:
         str: Path to the generated video.
     """
+    return render_storyboard(text, settings)["video"]
+
+def render_storyboard(text, settings=None, stream=False, progress=None):
+    """
+    Render a storyboard video and report how it was produced.
+
+    Videos are cached by a key over the text and render settings: an existing video is returned
+    without re-rendering, and concurrent requests for the same key share one render.
+    Args:
+        text (str): Input story text (sentences separated by periods).
+        settings (RenderSettings): Output size, frame rate and voice. Defaults to RenderSettings().
+        stream (bool): Also publish each scene to the HLS playlist at stream_path_for(key) as it finishes.
+        progress (callable): Receives the render's progress events, see generate_sentence_by_sentence_video.
+            A render shared with an earlier caller reports to that caller only.
+    Returns:
+        dict: "video" path, or None if no sentence could be rendered, whether it was "cached",
+        and "segments_total" / "segments_reused".
+    """
+    settings = settings or RenderSettings()
+    key = render_cache_key(text, settings)
+    cached = cached_video(key)
+    if cached:
+        metrics.increment("storyboard_renders_total", result="cached")
+        return {"video": cached, "cached": True, "segments_total": None, "segments_reused": None}
+    # A streaming render never joins a plain one, which would publish no playlist
+    flight_key = f"{key}:stream" if stream else key
+    return _render_flight.do(flight_key, _render_to_cache, text, settings, key, stream, progress)[0]
+
+def _render_to_cache(text, settings, key, stream=False, progress=None):
+    """
+    Render a storyboard into its cache path.
+
+    The video is written to a temporary name and moved into place once complete, so a
+    partially written file is never served as a cache hit. With stream set, scenes are
+    published to an HLS EVENT playlist while the render is still running.
+    """
+    cached = cached_video(key)
+    if cached:
+        return {"video": cached, "cached": True, "segments_total": None, "segments_reused": None}
+
     # Ensure output directory exists
-    output_dir = "frontend/generated_videos"
-    os.makedirs(output_dir, exist_ok=True)
-
-    # Generate a unique filename based on the input text
-    hash_object = hashlib.md5(text.encode())
-    video_filename = f"storyboard_{hash_object.hexdigest()[:8]}.mp4"
-    output_path = os.path.join(output_dir, video_filename)
-    final_output_path = output_path.replace("/frontend", "")  # Adjust path for serving
+    output_path = video_path_for(key)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    temp_path = output_path.replace(".mp4", f".{uuid.uuid4().hex[:8]}.part.mp4")
+
+    playlist = None
+    if stream:
+        prune_streams()
+        playlist = HlsPlaylist(stream_path_for(key))
+        playlist.start()
+
     # Generate the video using the existing function
-    generate_sentence_by_sentence_video(text, output_filename=output_path)
-    return final_output_path
+    try:
+        with metrics.span("storyboard_render", slow_after=SLOW_RENDER_SECONDS, encoder=RENDER_ENCODER):
+            stats = generate_sentence_by_sentence_video(
+                text,
+                output_filename=temp_path,
+                settings=settings,
+                on_segment=playlist.add_segment if playlist else None,
+                progress=progress,
+            ) or {}
+        if os.path.exists(temp_path):
+            os.replace(temp_path, output_path)
+    finally:
+        # A failed render still ends its playlist so players stop waiting for more scenes
+        if playlist:
+            playlist.end()
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    # Every sentence can be skipped, in which case nothing was written
+    rendered = os.path.exists(output_path)
+    metrics.increment("storyboard_renders_total", result="rendered" if rendered else "empty")
+    return {
+        "video": output_path if rendered else None,
+        "cached": False,
+        "segments_total": stats.get("segments_total", 0),
+        "segments_reused": stats.get("segments_reused", 0),
+    }
+
+def render_storyboard_batch(texts, settings=None, concurrency=None, progress=None):
+    """
+    Render many storyboards together, generating each distinct sentence's assets only once.
+
+    Sentences are deduplicated across the whole batch and their narration and backgrounds are
+    generated up front, filling the audio and image caches. The stories are then rendered
+    concurrently; shared sentences hit those caches and the segment cache.
+    Args:
+        texts (list): Input story texts.
+        settings (RenderSettings): Output size, frame rate and voice. Defaults to RenderSettings().
+        concurrency (int): Sentences processed at the same time. Defaults to ASSET_CONCURRENCY.
+        progress (callable): Receives an "assets" event once the shared assets are ready and a "story"
+            event as each story finishes.
+    Returns:
+        dict: "results", one render_storyboard result or {"error": ...} per story in order,
+        and "timing" with sentence counts and seconds spent per phase.
+    """
+    settings = settings or RenderSettings()
+    started = time.perf_counter()
+
+    # Stories already rendered need no assets at all
+    pending = [text for text in texts if not cached_video(render_cache_key(text, settings))]
+    sentences = [sentence for text in pending for sentence in split_sentences(text)]
+    unique_sentences = list(dict.fromkeys(sentences))
+
+    # Scenes already in the segment cache need no assets either
+    if RENDER_ENCODER == "still":
+        missing = [sentence for sentence in unique_sentences if not segment_cache().get(segment_cache_key(sentence, settings))]
+    else:
+        missing = unique_sentences
+
+    workdir = tempfile.mkdtemp(prefix="storyboard_batch_")
+    try:
+        with metrics.span("render_stage", slow_after=SLOW_RENDER_SECONDS, stage="batch_assets"):
+            generate_sentence_assets(missing, settings, workdir, concurrency)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    assets_done = time.perf_counter()
+    report(progress, "assets", sentences=len(missing))
+
+    def render(item):
+        index, text = item
+        try:
+            result = render_storyboard(text, settings)
+        except Exception as e:
+            print(f"Batch render failed for story: {e}")
+            result = {"video": None, "error": str(e)}
+        if not result["video"] and not result.get("error"):
+            result["error"] = "Render produced no video"
+        video = result["video"].replace("frontend/", "") if result["video"] else None
+        report(progress, "story", story=index, video=video, error=result.get("error"))
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, min(BATCH_STORY_CONCURRENCY, len(texts) or 1)), thread_name_prefix="batch") as pool:
+        results = list(pool.map(render, enumerate(texts)))
+    finished = time.perf_counter()
+
+    return {
+        "results": results,
+        "timing": {
+            "stories": len(texts),
+            "total_sentences": len(sentences),
+            "unique_sentences": len(unique_sentences),
+            "sentences_generated": len(missing),
+            "assets_seconds": round(assets_done - started, 3),
+            "render_seconds": round(finished - assets_done, 3),
+            "total_seconds": round(finished - started, 3),
+        },
+    }
@@ -0,0 +1,86 @@
+import math
+import os
+import shutil
+from typing import List, Tuple
+
+from storyboard.encoder import media_duration, remux_to_ts, split_to_ts
+
+# Advertised upper bound of a segment's length in seconds; HLS forbids changing it mid-playlist,
+# so longer scenes are cut into several segments
+HLS_TARGET_DURATION = int(os.getenv("HLS_TARGET_DURATION", "30"))
+
+
+class HlsPlaylist:
+    """
+    Publishes scene segments as an HLS EVENT playlist while a storyboard renders.
+
+    Each finished scene is copied into an MPEG-TS segment that continues the
+    timeline of the previous one, and the playlist is rewritten atomically to
+    reference it, so players can start on the first scene and pick up new
+    scenes as they are appended. end() marks the playlist complete.
+
+    The target duration is fixed when the playlist is created, because
+    players read it once and RFC 8216 does not allow it to change. A scene
+    longer than the target is cut into several segments that fit it.
+    """
+
+    def __init__(self, playlist_path: str, target_duration: int = HLS_TARGET_DURATION):
+        self.playlist_path = playlist_path
+        self.directory = os.path.dirname(playlist_path)
+        self.target_duration = target_duration
+        self._entries: List[Tuple[str, float]] = []
+        self._offset = 0.0
+        self._scenes = 0
+
+    def start(self) -> None:
+        """Clear segments left by an interrupted render and create the directory."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def add_segment(self, segment: str) -> None:
+        """
+        Append an encoded scene to the playlist.
+
+        Args:
+            segment: MP4 segment of the next scene, in playback order
+        """
+        duration = media_duration(segment)
+        name = f"scene_{self._scenes:04d}"
+        # The segments are complete on disk before the playlist references them
+        if math.ceil(duration) <= self.target_duration:
+            remux_to_ts(segment, os.path.join(self.directory, name + ".ts"), self._offset)
+            pieces = [(name + ".ts", duration)]
+        else:
+            # A second of headroom keeps pieces within the target once audio packets are rounded up
+            pattern = os.path.join(self.directory, name + "_%02d.ts")
+            pieces = [
+                (os.path.basename(path), length)
+                for path, length in split_to_ts(segment, pattern, self._offset, max(1, self.target_duration - 1))
+            ]
+        self._scenes += 1
+        self._entries.extend(pieces)
+        self._offset += sum(length for _, length in pieces)
+        self._write(ended=False)
+
+    def end(self) -> None:
+        """Mark the playlist complete so players stop polling it."""
+        self._write(ended=True)
+
+    def _write(self, ended: bool) -> None:
+        """Rewrite the playlist through a temporary file so readers never see a partial one."""
+        lines = [
+            "#EXTM3U",
+            "#EXT-X-VERSION:3",
+            "#EXT-X-PLAYLIST-TYPE:EVENT",
+            f"#EXT-X-TARGETDURATION:{self.target_duration}",
+            "#EXT-X-MEDIA-SEQUENCE:0",
+        ]
+        for name, duration in self._entries:
+            lines.append(f"#EXTINF:{duration:.3f},")
+            lines.append(name)
+        if ended:
+            lines.append("#EXT-X-ENDLIST")
+        temp_path = self.playlist_path + ".tmp"
+        with open(temp_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(temp_path, self.playlist_path)
@@ -0,0 +1,56 @@
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+from moviepy.editor import VideoClip
+
+
+class SequentialTimeline:
+    """
+    A timeline of still scenes played back to back.
+
+    Frame lookup is a binary search over scene start times, and scene frames
+    are built on demand from their factories when their scene starts. Only
+    the active scene's frame is kept in memory, so cost per frame and
+    resident memory stay flat however many scenes the story has.
+    """
+
+    def __init__(
+        self,
+        scenes: List[Callable[[], np.ndarray]],
+        durations: List[float],
+        size: Tuple[int, int],
+    ):
+        self.scenes = scenes
+        self.durations = durations
+        self.size = size
+        self.starts = [0.0] + list(accumulate(durations))[:-1]
+        self.duration = sum(durations)
+        self._index: Optional[int] = None
+        self._frame: Optional[np.ndarray] = None
+
+    def scene_at(self, t: float) -> int:
+        """Return the index of the scene playing at time t."""
+        return min(max(bisect_right(self.starts, t) - 1, 0), len(self.scenes) - 1)
+
+    def frame(self, t: float) -> np.ndarray:
+        """
+        Return the frame at time t.
+
+        Args:
+            t: Time in seconds
+
+        Returns:
+            RGB frame of the active scene
+        """
+        index = self.scene_at(t)
+        if index != self._index:
+            # Frames are requested in order, so the previous scene is never needed again
+            self._frame = self.scenes[index]()
+            self._index = index
+        return self._frame
+
+    def clip(self) -> VideoClip:
+        """Return a MoviePy clip that streams the timeline's frames."""
+        return VideoClip(make_frame=self.frame, duration=self.duration)
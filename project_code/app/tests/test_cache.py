@@ -0,0 +1,48 @@
+from storyboard.cache import DiskCache
+
+
+def write(content: bytes):
+    def create(path):
+        with open(path, "wb") as f:
+            f.write(content)
+
+    return create
+
+
+def test_file_written_by_another_process_is_reused(tmp_path):
+    # Two instances on one directory stand in for two worker processes
+    first = DiskCache(str(tmp_path), 1 << 20, ".mp3")
+    second = DiskCache(str(tmp_path), 1 << 20, ".mp3")
+
+    path = first.get_or_create("key", write(b"first"))
+    assert second.get("key") == path
+    assert second.stats()["bytes"] == len(b"first")
+
+    second.get_or_create("key", write(b"second"))
+    with open(path, "rb") as f:
+        assert f.read() == b"first"
+
+
+def test_adopted_files_count_against_the_budget(tmp_path):
+    first = DiskCache(str(tmp_path), 10, ".mp3")
+    second = DiskCache(str(tmp_path), 10, ".mp3")
+
+    second.get_or_create("old", write(b"123456"))
+    first.get_or_create("new", write(b"123456"))
+    assert second.get("new")
+    # Adopting "new" pushed the second cache over budget, so its older entry was evicted
+    assert second.get("old") is None
+    assert not (tmp_path / "old.mp3").exists()
+
+
+def test_shared_cache_is_created_on_first_use(tmp_path, monkeypatch):
+    from storyboard import cache
+
+    directory = tmp_path / "audio"
+    monkeypatch.setattr(cache, "AUDIO_CACHE_DIR", str(directory))
+    monkeypatch.setattr(cache, "_audio_cache", None)
+    assert not directory.exists()
+
+    shared = cache.audio_cache()
+    assert directory.is_dir()
+    assert cache.audio_cache() is shared
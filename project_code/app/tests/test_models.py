@@ -0,0 +1,18 @@
+import pytest
+from pydantic import ValidationError
+
+from storyboard.models import RenderSettings
+
+
+def test_defaults_are_valid():
+    settings = RenderSettings()
+    assert (settings.width, settings.height, settings.fps) == (512, 512, 24)
+
+
+@pytest.mark.parametrize(
+    "field, value",
+    [("width", 32), ("height", 4096), ("fps", 0), ("fps", 240), ("lang", "xx"), ("tld", "example.com")],
+)
+def test_out_of_range_settings_are_rejected(field, value):
+    with pytest.raises(ValidationError):
+        RenderSettings(**{field: value})
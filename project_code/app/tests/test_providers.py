@@ -0,0 +1,47 @@
+import pytest
+
+from storyboard.providers import ProviderClient, ProviderHTTPError
+
+
+def make_client() -> ProviderClient:
+    """A client whose circuit opens on the first failure and half-opens right away."""
+    client = ProviderClient("test", rate=0, burst=1, timeout=1, retries=0)
+    client.breaker.failures = 1
+    client.breaker.reset_seconds = 0
+    return client
+
+
+def unavailable():
+    raise ProviderHTTPError("test", 503)
+
+
+def test_failures_open_the_circuit():
+    client = make_client()
+    with pytest.raises(ProviderHTTPError):
+        client.call(unavailable)
+    assert client.breaker.state == "open"
+
+
+def test_successful_trial_closes_the_circuit():
+    client = make_client()
+    with pytest.raises(ProviderHTTPError):
+        client.call(unavailable)
+    assert client.call(lambda: "ok") == "ok"
+    assert client.breaker.state == "closed"
+
+
+def test_unclassified_error_during_trial_releases_it():
+    client = make_client()
+    with pytest.raises(ProviderHTTPError):
+        client.call(unavailable)
+
+    def unsupported_language():
+        raise ValueError("Language not supported: xx")
+
+    # The trial fails locally, which says nothing about the provider
+    with pytest.raises(ValueError):
+        client.call(unsupported_language)
+    assert client.breaker.state == "half_open"
+
+    assert client.call(lambda: "ok") == "ok"
+    assert client.breaker.state == "closed"
@@ -0,0 +1,36 @@
+import math
+
+import numpy as np
+
+from storyboard.encoder import encode_still_scene, run_ffmpeg
+from storyboard.streaming import HlsPlaylist
+
+
+def still_scene(directory, seconds: float) -> str:
+    audio = str(directory / "tone.m4a")
+    run_ffmpeg(["-f", "lavfi", "-i", f"sine=duration={seconds}", "-c:a", "aac", audio])
+    frame = np.zeros((64, 64, 3), dtype=np.uint8)
+    return encode_still_scene(frame, audio, seconds, str(directory / "scene.mp4"), fps=10)
+
+
+def playlist_lines(path):
+    with open(path) as f:
+        return f.read().splitlines()
+
+
+def test_scene_longer_than_the_target_is_cut_into_segments(tmp_path):
+    segment = still_scene(tmp_path, 7.0)
+    playlist = HlsPlaylist(str(tmp_path / "hls" / "index.m3u8"), target_duration=3)
+    playlist.start()
+    playlist.add_segment(segment)
+    playlist.end()
+
+    lines = playlist_lines(tmp_path / "hls" / "index.m3u8")
+    durations = [float(line[len("#EXTINF:"):].rstrip(",")) for line in lines if line.startswith("#EXTINF:")]
+    assert "#EXT-X-TARGETDURATION:3" in lines
+    assert len(durations) > 1
+    assert all(math.ceil(duration) <= 3 for duration in durations)
+    assert abs(sum(durations) - 7.0) < 0.5
+    for line in lines:
+        if line.endswith(".ts"):
+            assert (tmp_path / "hls" / line).is_file()
@@ -1,8 +1,9 @@
-from typing import Union
-from fastapi import APIRouter
-from utils.response_models import SuccessResponse,ErrorResponse
-from utils.query_helpers import QueryHelper
+from typing import Optional, Union
+from fastapi import APIRouter, Query
+from utils.response_models import SuccessResponse,ErrorResponse,PaginatedSuccessResponse
+from utils.async_query_helpers import AsyncQueryHelper
 from user.models import User
+from utils.export import ndjson_export
 router = APIRouter()
 
 @router.post("/signup", response_model=Union[SuccessResponse, ErrorResponse])
@@ -10,14 +11,21 @@ async def signup(user: User):
     """
     User signup endpoint.
     """
-    user_found = QueryHelper.find_one("users", {"username": user.username})
+    user_found = await AsyncQueryHelper.find_one("users", {"username": user.username})
     if user_found:
         return ErrorResponse(
             success=False,
             errors=[{"message": "Username already exists"}],
             code=409,
         )
-    user= QueryHelper.insert_one("users", user.dict())
+    user= await AsyncQueryHelper.insert_one("users", user.dict())
+    if isinstance(user, ErrorResponse) and user.code == 409:
+        # Another signup for the same username won the race on the unique index
+        return ErrorResponse(
+            success=False,
+            errors=[{"message": "Username already exists"}],
+            code=409,
+        )
     if isinstance(user, ErrorResponse):
         return ErrorResponse(
             success=False,
@@ -36,7 +44,7 @@ async def login(user: User):
     """
     User login endpoint.
     """
-    user_found = QueryHelper.find_one(
+    user_found = await AsyncQueryHelper.find_one(
         "users", {"username": user.username, "password": user.password}
     )
     if user_found:
@@ -54,38 +62,60 @@ async def login(user: User):
         )
         
 
-@router.get("/all_users", response_model=Union[SuccessResponse, ErrorResponse])
-async def get_all_users():
+@router.get("/all_users", response_model=Union[PaginatedSuccessResponse, ErrorResponse])
+async def get_all_users(limit: int = Query(10, ge=1, le=100), cursor: Optional[str] = None):
     """
-    Get all users endpoint.
+    Get all users endpoint, newest first. Pass the returned next_cursor to get the next page.
     """
-    users = QueryHelper.find("users",{"username": { "$ne": "admin"} } )
-    if not users:
+    page = await AsyncQueryHelper.find_page(
+        "users",
+        {"username": { "$ne": "admin"} },
+        limit=limit,
+        cursor=cursor,
+        projection={"password": 0},
+    )
+    if isinstance(page, ErrorResponse):
+        return page
+    if not page["data"] and not cursor:
         return ErrorResponse(
             success=False,
             errors=[{"message": "No users found"}],
             code=404,
         )
-    return SuccessResponse(
+    return PaginatedSuccessResponse(
         success=True,
-        data={"users": users},
+        data=page["data"],
+        pagination={"size": limit, "next_cursor": page["next_cursor"], "has_more": page["has_more"]},
         message="Users retrieved successfully",
         code=200,
     )
     
+@router.get("/export")
+async def export_users():
+    """
+    Export all users as newline-delimited JSON, streamed with constant memory.
+    """
+    return ndjson_export(
+        "users",
+        {"username": { "$ne": "admin"} },
+        "users.ndjson",
+        sort=[("created_on", -1), ("_id", -1)],
+        projection={"password": 0},
+    )
+
 @router.delete("/delete_user/{username}", response_model=Union[SuccessResponse, ErrorResponse])
 async def delete_user(username: str):
     """
     Delete user endpoint.
     """
-    user_found = QueryHelper.find_one("users", {"username": username})
+    user_found = await AsyncQueryHelper.find_one("users", {"username": username})
     if not user_found:
         return ErrorResponse(
             success=False,
             errors=[{"message": "User not found"}],
             code=404,
         )
-    QueryHelper.delete_one("users", {"username": username})
+    await AsyncQueryHelper.delete_one("users", {"username": username})
     return SuccessResponse(
         success=True,
         message="User deleted successfully",
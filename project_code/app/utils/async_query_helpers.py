@@ -0,0 +1,134 @@
+import os
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from utils.query_helpers import QueryHelper
+from utils.response_models import ErrorResponse
+
+# Threads dedicated to MongoDB round trips; bounds concurrent operations per API process
+DB_IO_WORKERS = int(os.getenv("DB_IO_WORKERS", "16"))
+
+io_executor = ThreadPoolExecutor(max_workers=DB_IO_WORKERS, thread_name_prefix="mongo-io")
+
+
+async def _run(fn, *args, **kwargs):
+    """Run a blocking QueryHelper call on the I/O executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(io_executor, functools.partial(fn, *args, **kwargs))
+
+
+class AsyncQueryHelper:
+    """
+    Awaitable counterpart of QueryHelper for use in async route handlers.
+
+    Every method has the same signature and return values as its QueryHelper
+    counterpart and delegates to it on a dedicated I/O thread pool, so
+    document transformation and error handling are identical while the event
+    loop keeps serving other requests during each MongoDB round trip.
+    """
+
+    _transform_document = staticmethod(QueryHelper._transform_document)
+    _transform_documents = staticmethod(QueryHelper._transform_documents)
+    get_object_id = staticmethod(QueryHelper.get_object_id)
+    cache_stats = staticmethod(QueryHelper.cache_stats)
+
+    @staticmethod
+    async def insert_one(
+        collection_name: str, document: Dict, return_fresh: bool = False
+    ) -> Union[Dict, ErrorResponse]:
+        """Awaitable QueryHelper.insert_one."""
+        return await _run(QueryHelper.insert_one, collection_name, document, return_fresh)
+
+    @staticmethod
+    async def find_one(collection_name: str, query: Dict) -> Union[Dict, ErrorResponse]:
+        """Awaitable QueryHelper.find_one."""
+        return await _run(QueryHelper.find_one, collection_name, query)
+
+    @staticmethod
+    async def find(
+        collection_name: str,
+        query: Dict,
+        skip: int = 0,
+        limit: int = 10,
+        sort: Optional[List[Tuple[str, int]]] = None,
+        projection: Optional[Dict[str, int]] = None,
+    ) -> Union[List[Dict], ErrorResponse]:
+        """Awaitable QueryHelper.find."""
+        return await _run(QueryHelper.find, collection_name, query, skip, limit, sort, projection)
+
+    @staticmethod
+    async def find_page(
+        collection_name: str,
+        query: Dict,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        projection: Optional[Dict[str, int]] = None,
+        direction: int = -1,
+    ) -> Union[Dict, ErrorResponse]:
+        """Awaitable QueryHelper.find_page."""
+        return await _run(QueryHelper.find_page, collection_name, query, limit, cursor, projection, direction)
+
+    @staticmethod
+    async def update_one(
+        collection_name: str, query: Dict, update: Dict, upsert: bool = False
+    ) -> Union[Dict, ErrorResponse]:
+        """Awaitable QueryHelper.update_one."""
+        return await _run(QueryHelper.update_one, collection_name, query, update, upsert)
+
+    @staticmethod
+    async def delete_one(collection_name: str, query: Dict) -> Union[Dict, ErrorResponse]:
+        """Awaitable QueryHelper.delete_one."""
+        return await _run(QueryHelper.delete_one, collection_name, query)
+
+    @staticmethod
+    async def count_documents(collection_name: str, query: Dict) -> Union[int, ErrorResponse]:
+        """Awaitable QueryHelper.count_documents."""
+        return await _run(QueryHelper.count_documents, collection_name, query)
+
+    @staticmethod
+    async def aggregate(
+        collection_name: str, pipeline: List[Dict]
+    ) -> Union[List[Dict], ErrorResponse]:
+        """Awaitable QueryHelper.aggregate."""
+        return await _run(QueryHelper.aggregate, collection_name, pipeline)
+
+    @staticmethod
+    async def bulk_insert(
+        collection_name: str,
+        documents: List[Dict],
+        return_fresh: bool = False,
+        ordered: bool = True,
+    ) -> Union[List[Dict], ErrorResponse]:
+        """Awaitable QueryHelper.bulk_insert."""
+        return await _run(QueryHelper.bulk_insert, collection_name, documents, return_fresh, ordered)
+
+    @staticmethod
+    async def bulk_write(
+        collection_name: str, operations: List[Dict], ordered: bool = True
+    ) -> Union[Dict, ErrorResponse]:
+        """Awaitable QueryHelper.bulk_write."""
+        return await _run(QueryHelper.bulk_write, collection_name, operations, ordered)
+
+    @staticmethod
+    async def update_many(
+        collection_name: str, query: Dict, update: Dict, return_fresh: bool = False
+    ) -> Union[Dict, List[Dict], ErrorResponse]:
+        """Awaitable QueryHelper.update_many."""
+        return await _run(QueryHelper.update_many, collection_name, query, update, return_fresh)
+
+    @staticmethod
+    async def delete_many(collection_name: str, query: Dict) -> Union[Dict, ErrorResponse]:
+        """Awaitable QueryHelper.delete_many."""
+        return await _run(QueryHelper.delete_many, collection_name, query)
+
+    @staticmethod
+    async def ensure_indexes() -> Union[Dict[str, List[str]], ErrorResponse]:
+        """Awaitable QueryHelper.ensure_indexes."""
+        return await _run(QueryHelper.ensure_indexes)
+
+    @staticmethod
+    async def explain_query_shapes() -> Union[List[Dict[str, Any]], ErrorResponse]:
+        """Awaitable QueryHelper.explain_query_shapes."""
+        return await _run(QueryHelper.explain_query_shapes)
@@ -0,0 +1,54 @@
+import re
+import json
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from fastapi.responses import StreamingResponse
+
+from utils.query_helpers import QueryHelper
+
+
+def ndjson_lines(batches: Iterator[List[Dict]]) -> Iterator[str]:
+    """
+    Serialize batches of documents as newline-delimited JSON, one chunk per batch.
+
+    Args:
+        batches: Batches yielded by QueryHelper.stream
+
+    Yields:
+        One string per batch containing one JSON document per line
+    """
+    for batch in batches:
+        yield "".join(json.dumps(doc, default=str) + "\n" for doc in batch)
+
+
+def ndjson_export(
+    collection_name: str,
+    query: Dict,
+    filename: str,
+    sort: Optional[List[Tuple[str, int]]] = None,
+    projection: Optional[Dict[str, int]] = None,
+) -> StreamingResponse:
+    """
+    Stream the documents matching a query as an NDJSON download.
+
+    The generator is synchronous, so Starlette iterates it on its thread pool
+    and the blocking cursor reads stay off the event loop. Memory use is one
+    batch regardless of the result size.
+
+    Args:
+        collection_name: Name of the MongoDB collection
+        query: Query criteria to match documents
+        filename: Name offered to the browser for the download; unsafe characters are replaced
+        sort: List of tuples specifying sort fields and directions
+        projection: Fields to include (1) or exclude (0)
+
+    Returns:
+        A StreamingResponse with media type application/x-ndjson
+    """
+    filename = re.sub(r"[^A-Za-z0-9._-]", "_", filename)
+    batches = QueryHelper.stream(collection_name, query, sort=sort, projection=projection)
+    return StreamingResponse(
+        ndjson_lines(batches),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
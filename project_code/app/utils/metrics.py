@@ -0,0 +1,250 @@
+import os
+import time
+import bisect
+import datetime
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+# Operations slower than this many seconds are logged and kept in the slow-operation log
+SLOW_OPERATION_SECONDS = float(os.getenv("SLOW_OPERATION_SECONDS", "2.0"))
+# Number of slow operations kept for /metrics/slow
+SLOW_OPERATION_LOG_SIZE = int(os.getenv("SLOW_OPERATION_LOG_SIZE", "200"))
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+class Sample(NamedTuple):
+    """One value reported by a collector at scrape time."""
+
+    name: str
+    kind: str
+    labels: Dict[str, Any]
+    value: float
+
+
+class Span:
+    """Handle of a timed operation, used to mark it failed without raising."""
+
+    def __init__(self):
+        self.failed = False
+
+    def fail(self) -> None:
+        """Count the operation as failed."""
+        self.failed = True
+
+
+class Metrics:
+    """
+    In-process latency histograms, counters and a slow-operation log.
+
+    Timings are recorded with span(), which feeds the <metric>_seconds
+    histogram and, on an exception or Span.fail(), the <metric>_failures_total
+    counter. Values owned elsewhere, such as cache statistics, are read at
+    scrape time through registered collectors. Everything is rendered in the
+    Prometheus text format.
+
+    Each process keeps its own metrics: spans recorded inside process-pool
+    workers are not visible to the API process.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, Tuple], List] = {}
+        self._counters: Dict[Tuple[str, Tuple], float] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+        self.slow_operations: deque = deque(maxlen=SLOW_OPERATION_LOG_SIZE)
+
+    @staticmethod
+    def _label_key(labels: Dict[str, Any]) -> Tuple:
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def increment(self, name: str, amount: float = 1, **labels) -> None:
+        """
+        Add to a counter.
+
+        Args:
+            name: Counter name, conventionally ending in _total
+            amount: Value to add
+            **labels: Label values of the series
+        """
+        key = (name, self._label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        """
+        Record a duration in a latency histogram.
+
+        Args:
+            name: Histogram name, conventionally ending in _seconds
+            seconds: Observed duration
+            **labels: Label values of the series
+        """
+        key = (name, self._label_key(labels))
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                histogram[0][index] += 1
+            histogram[1] += seconds
+            histogram[2] += 1
+
+    @contextmanager
+    def span(self, metric: str, slow_after: Optional[float] = None, **labels) -> Iterator[Span]:
+        """
+        Time the enclosed block.
+
+        Args:
+            metric: Base name; feeds <metric>_seconds and <metric>_failures_total
+            slow_after: Seconds after which the operation is logged as slow, defaults to SLOW_OPERATION_SECONDS
+            **labels: Label values identifying the operation
+
+        Yields:
+            A Span whose fail() counts the operation as failed
+        """
+        span = Span()
+        started = time.perf_counter()
+        try:
+            yield span
+        except Exception:
+            span.failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.observe(f"{metric}_seconds", elapsed, **labels)
+            if span.failed:
+                self.increment(f"{metric}_failures_total", **labels)
+            if elapsed >= (SLOW_OPERATION_SECONDS if slow_after is None else slow_after):
+                self._log_slow(metric, labels, elapsed, span.failed)
+
+    def _log_slow(self, metric: str, labels: Dict[str, Any], seconds: float, failed: bool) -> None:
+        """Record an operation that exceeded SLOW_OPERATION_SECONDS."""
+        self.increment("slow_operations_total", metric=metric)
+        entry = {
+            "metric": metric,
+            "labels": {k: str(v) for k, v in labels.items()},
+            "seconds": round(seconds, 3),
+            "failed": failed,
+            "at": datetime.datetime.utcnow().isoformat(),
+        }
+        self.slow_operations.append(entry)
+        print(f"Slow operation {metric} {entry['labels']}: {seconds:.3f}s")
+
+    def register_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        """
+        Read extra samples at every scrape.
+
+        Args:
+            collector: Called without arguments, returns the current samples
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+    def summary(self, name: str) -> List[Dict[str, Any]]:
+        """
+        Return the count and total seconds of every series of a histogram.
+
+        Args:
+            name: Histogram name, e.g. "render_stage_seconds"
+
+        Returns:
+            One dict per label set with "labels", "count" and "seconds"
+        """
+        with self._lock:
+            return [
+                {"labels": dict(labels), "count": histogram[2], "seconds": histogram[1]}
+                for (series, labels), histogram in sorted(self._histograms.items())
+                if series == name
+            ]
+
+    def slow_log(self) -> List[Dict[str, Any]]:
+        """Return the logged slow operations, newest first."""
+        return list(reversed(self.slow_operations))
+
+    @staticmethod
+    def _format_labels(labels: Tuple) -> str:
+        if not labels:
+            return ""
+        pairs = (
+            k + '="' + v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+            for k, v in labels
+        )
+        return "{" + ",".join(pairs) + "}"
+
+    def render(self) -> str:
+        """
+        Render every series in the Prometheus text exposition format.
+
+        Returns:
+            The exposition text
+        """
+        with self._lock:
+            histograms = {key: (list(h[0]), h[1], h[2]) for key, h in self._histograms.items()}
+            counters = dict(self._counters)
+            collectors = list(self._collectors)
+
+        families: Dict[str, Tuple[str, List[str]]] = {}
+
+        def family(name: str, kind: str) -> List[str]:
+            return families.setdefault(name, (kind, []))[1]
+
+        for (name, labels), value in sorted(counters.items()):
+            family(name, "counter").append(f"{name}{self._format_labels(labels)} {value}")
+        for (name, labels), (buckets, total, count) in sorted(histograms.items()):
+            lines = family(name, "histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, buckets):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{self._format_labels(labels + (('le', str(bound)),))} {cumulative}")
+            lines.append(f"{name}_bucket{self._format_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{name}_sum{self._format_labels(labels)} {total}")
+            lines.append(f"{name}_count{self._format_labels(labels)} {count}")
+        for collector in collectors:
+            try:
+                samples = list(collector())
+            except Exception as e:
+                print(f"Metrics collector failed: {e}")
+                continue
+            for sample in samples:
+                labels = self._label_key(sample.labels)
+                family(sample.name, sample.kind).append(f"{sample.name}{self._format_labels(labels)} {sample.value}")
+
+        output = []
+        for name, (kind, lines) in families.items():
+            output.append(f"# TYPE {name} {kind}")
+            output.extend(lines)
+        return "\n".join(output) + "\n"
+
+
+def cache_collector(name: str, cache) -> Callable[[], List[Sample]]:
+    """
+    Build a collector exporting the stats() of a DiskCache or MemoryCache.
+
+    Args:
+        name: Value of the "cache" label
+        cache: Object whose stats() returns hits, misses, evictions, entries and bytes
+
+    Returns:
+        A collector for Metrics.register_collector
+    """
+
+    def collect() -> List[Sample]:
+        stats = cache.stats()
+        labels = {"cache": name}
+        return [
+            Sample("cache_hits_total", "counter", labels, stats["hits"]),
+            Sample("cache_misses_total", "counter", labels, stats["misses"]),
+            Sample("cache_evictions_total", "counter", labels, stats["evictions"]),
+            Sample("cache_entries", "gauge", labels, stats["entries"]),
+            Sample("cache_bytes", "gauge", labels, stats["bytes"]),
+        ]
+
+    return collect
+
+
+metrics = Metrics()
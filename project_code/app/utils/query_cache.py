@@ -0,0 +1,270 @@
+import os
+import copy
+import json
+import time
+import functools
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from utils.response_models import ErrorResponse
+from utils.metrics import Sample, metrics
+
+# Set QUERY_CACHE_ENABLED=1 to serve repeated QueryHelper reads from memory
+QUERY_CACHE_ENABLED = os.getenv("QUERY_CACHE_ENABLED", "0") == "1"
+# Default seconds a cached read stays valid, and cached reads kept per collection
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "30"))
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "1024"))
+# Reads filtering on these fields are never cached, so credentials are not kept in memory
+UNCACHED_FIELDS = frozenset({"password"})
+
+
+def _equalities(query: Optional[Dict]) -> Dict[str, Any]:
+    """Return the top-level field equality constraints of a query."""
+    if not query:
+        return {}
+    return {
+        field: value
+        for field, value in query.items()
+        if not field.startswith("$") and not isinstance(value, dict)
+    }
+
+
+def _may_match(constraints: Dict[str, Any], values: Dict[str, Any]) -> bool:
+    """
+    Return False only if values provably fall outside a cached query.
+
+    Fields the cached query constrains with anything but equality, and fields
+    missing from values, are treated as possible matches.
+    """
+    return all(
+        field not in values or values[field] == expected
+        for field, expected in constraints.items()
+    )
+
+
+class QueryCache:
+    """
+    An in-process read-through cache for QueryHelper reads.
+
+    Each collection has its own LRU of results bounded by entry count, and
+    every entry expires after the collection's TTL. Writes through
+    QueryHelper drop the entries of the written collection that the written
+    documents or write query could affect; entries whose equality filters
+    provably exclude them are kept. Values are deep-copied in and out so
+    callers can mutate what they receive. Every invalidation bumps the
+    collection's generation, and a read that started before the bump does
+    not store its possibly stale result.
+
+    The cache is per process: with several API workers, a write made through
+    another worker is only seen here after the TTL expires.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = QUERY_CACHE_ENABLED,
+        ttl: float = QUERY_CACHE_TTL,
+        max_entries: int = QUERY_CACHE_MAX_ENTRIES,
+    ):
+        self.enabled = enabled
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._settings: Dict[str, Tuple[float, int]] = {}
+        self._entries: Dict[str, "OrderedDict[str, Tuple[float, Dict[str, Any], Any]]"] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._generations: Dict[str, int] = {}
+
+    def configure(self, collection_name: str, ttl: Optional[float] = None, max_entries: Optional[int] = None) -> None:
+        """
+        Override the TTL or size bound of one collection.
+
+        Args:
+            collection_name: Name of the MongoDB collection
+            ttl: Seconds an entry stays valid; 0 disables caching for the collection
+            max_entries: Maximum cached reads for the collection
+        """
+        current_ttl, current_max = self._settings.get(collection_name, (self.ttl, self.max_entries))
+        with self._lock:
+            self._settings[collection_name] = (
+                current_ttl if ttl is None else ttl,
+                current_max if max_entries is None else max_entries,
+            )
+            self._entries.pop(collection_name, None)
+            self._bump(collection_name)
+
+    def _counters(self, collection_name: str) -> Dict[str, int]:
+        return self._stats.setdefault(
+            collection_name, {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0}
+        )
+
+    def _bump(self, collection_name: str) -> None:
+        # Called with the lock held
+        self._generations[collection_name] = self._generations.get(collection_name, 0) + 1
+
+    def generation(self, collection_name: str) -> int:
+        """Return a counter that changes whenever cached reads of the collection are invalidated."""
+        with self._lock:
+            return self._generations.get(collection_name, 0)
+
+    @staticmethod
+    def make_key(op: str, args: Tuple, kwargs: Dict) -> str:
+        """Build a cache key from a read operation and its arguments."""
+        return json.dumps([op, args, kwargs], sort_keys=True, default=str)
+
+    def get(self, collection_name: str, key: str) -> Tuple[bool, Any]:
+        """
+        Look up a cached read.
+
+        Returns:
+            Tuple of (hit, value)
+        """
+        now = time.monotonic()
+        with self._lock:
+            entries = self._entries.get(collection_name)
+            entry = entries.get(key) if entries else None
+            counters = self._counters(collection_name)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    del entries[key]
+                counters["misses"] += 1
+                return False, None
+            entries.move_to_end(key)
+            counters["hits"] += 1
+            value = entry[2]
+        return True, copy.deepcopy(value)
+
+    def set(
+        self, collection_name: str, key: str, query: Optional[Dict], value: Any, generation: Optional[int] = None
+    ) -> None:
+        """
+        Store a read result together with the equality filters of its query.
+
+        Args:
+            collection_name: Name of the MongoDB collection
+            key: Key from make_key
+            query: Filter of the read
+            value: Result of the read
+            generation: generation() taken before the read; the result is dropped if it has changed since
+        """
+        ttl, max_entries = self._settings.get(collection_name, (self.ttl, self.max_entries))
+        if ttl <= 0 or max_entries <= 0:
+            return
+        value = copy.deepcopy(value)
+        with self._lock:
+            if generation is not None and self._generations.get(collection_name, 0) != generation:
+                return
+            entries = self._entries.setdefault(collection_name, OrderedDict())
+            entries[key] = (time.monotonic() + ttl, _equalities(query), value)
+            entries.move_to_end(key)
+            while len(entries) > max_entries:
+                entries.popitem(last=False)
+                self._counters(collection_name)["evictions"] += 1
+
+    def _drop(self, collection_name: str, affected) -> None:
+        with self._lock:
+            # Reads in flight may have seen the data before this write
+            self._bump(collection_name)
+            entries = self._entries.get(collection_name)
+            if not entries:
+                return
+            stale = [key for key, (_, constraints, _) in entries.items() if affected(constraints)]
+            for key in stale:
+                del entries[key]
+            self._counters(collection_name)["invalidations"] += len(stale)
+
+    def invalidate_documents(self, collection_name: str, documents: Iterable[Dict]) -> None:
+        """Drop cached reads that newly written documents could appear in."""
+        documents = list(documents)
+        self._drop(collection_name, lambda c: any(_may_match(c, doc) for doc in documents))
+
+    def invalidate_query(self, collection_name: str, query: Dict, update: Optional[Dict] = None) -> None:
+        """
+        Drop cached reads affected by an update or delete.
+
+        Args:
+            collection_name: Name of the MongoDB collection
+            query: Filter of the write
+            update: Fields set by an update, which can move documents into other cached results
+        """
+        before = _equalities(query)
+        after = {**before, **(update or {})}
+        self._drop(collection_name, lambda c: _may_match(c, before) or _may_match(c, after))
+
+    def clear(self, collection_name: Optional[str] = None) -> None:
+        """Drop every cached read, or those of one collection."""
+        with self._lock:
+            if collection_name is None:
+                self._entries.clear()
+                for name in list(self._generations):
+                    self._bump(name)
+            else:
+                self._entries.pop(collection_name, None)
+                self._bump(collection_name)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return per-collection hit, miss, invalidation and eviction counters and hit ratio."""
+        with self._lock:
+            report = {}
+            for collection_name, counters in self._stats.items():
+                lookups = counters["hits"] + counters["misses"]
+                report[collection_name] = {
+                    **counters,
+                    "entries": len(self._entries.get(collection_name, ())),
+                    "hit_ratio": counters["hits"] / lookups if lookups else 0.0,
+                }
+            return report
+
+
+query_cache = QueryCache()
+
+
+def _collect_query_cache():
+    """Export the per-collection query cache counters."""
+    samples = []
+    for collection_name, stats in query_cache.stats().items():
+        labels = {"cache": "query", "collection": collection_name}
+        samples += [
+            Sample("cache_hits_total", "counter", labels, stats["hits"]),
+            Sample("cache_misses_total", "counter", labels, stats["misses"]),
+            Sample("cache_evictions_total", "counter", labels, stats["evictions"]),
+            Sample("cache_invalidations_total", "counter", labels, stats["invalidations"]),
+            Sample("cache_entries", "gauge", labels, stats["entries"]),
+        ]
+    return samples
+
+
+metrics.register_collector(_collect_query_cache)
+
+
+def cached_read(op: str):
+    """
+    Serve a QueryHelper read method through query_cache.
+
+    The wrapped method must take the collection name first and the query
+    second. Error responses and reads filtering on UNCACHED_FIELDS are never
+    cached.
+
+    Args:
+        op: Name of the read operation, part of the cache key
+    """
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(collection_name: str, *args, **kwargs):
+            query = args[0] if args else kwargs.get("query")
+            if not query_cache.enabled or (query and UNCACHED_FIELDS.intersection(query)):
+                return fn(collection_name, *args, **kwargs)
+            key = QueryCache.make_key(op, (collection_name, *args), kwargs)
+            hit, value = query_cache.get(collection_name, key)
+            if hit:
+                return value
+            generation = query_cache.generation(collection_name)
+            value = fn(collection_name, *args, **kwargs)
+            if not isinstance(value, ErrorResponse):
+                query_cache.set(collection_name, key, query, value, generation)
+            return value
+
+        return wrapper
+
+    return decorator
@@ -1,11 +1,70 @@
 from pymongo import MongoClient
 from config import MONGO_URI
+import json
+import base64
 import datetime
-from pymongo import MongoClient, ReturnDocument
+import inspect
+import functools
+from pymongo import MongoClient, ReturnDocument, IndexModel, ASCENDING, DESCENDING
+from pymongo import InsertOne, UpdateOne, UpdateMany, DeleteOne, DeleteMany
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from bson.objectid import ObjectId
-from typing import Dict, List, Optional, Tuple, Union
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 
 from utils.response_models import ErrorResponse
+from utils.query_cache import cached_read, query_cache
+from utils.metrics import metrics
+
+# Largest page find_page returns; larger limits are clamped to it
+MAX_PAGE_SIZE = 100
+
+
+def observed(op: str, collection: Optional[str] = None):
+    """
+    Record the latency of a QueryHelper operation per collection and op.
+
+    Returned ErrorResponses count as failures. Placed under cached_read, so
+    only calls that reach MongoDB are timed. Generators are timed from the
+    first batch until they are exhausted or closed.
+
+    Args:
+        op: Name of the operation, used as the "op" label
+        collection: Fixed "collection" label for operations spanning several
+            collections; by default the collection_name argument is used
+    """
+
+    def decorator(fn):
+        def timed(collection_name: str, call: Callable[[], Any]) -> Any:
+            with metrics.span("db_operation", collection=collection_name, op=op) as span:
+                result = call()
+                if isinstance(result, ErrorResponse):
+                    span.fail()
+                return result
+
+        if inspect.isgeneratorfunction(fn):
+
+            @functools.wraps(fn)
+            def generator(collection_name: str, *args, **kwargs):
+                with metrics.span("db_operation", collection=collection_name, op=op):
+                    yield from fn(collection_name, *args, **kwargs)
+
+            return generator
+
+        if collection is not None:
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                return timed(collection, lambda: fn(*args, **kwargs))
+
+            return wrapper
+
+        @functools.wraps(fn)
+        def wrapper(collection_name: str, *args, **kwargs):
+            return timed(collection_name, lambda: fn(collection_name, *args, **kwargs))
+
+        return wrapper
+
+    return decorator
 
 
 class QueryHelper:
@@ -24,6 +83,28 @@ class QueryHelper:
     except Exception as e:
         raise Exception(f"Error initializing MongoDB client: {e}")
 
+    # Indexes provisioned at startup by ensure_indexes, per collection
+    INDEXES: Dict[str, List[IndexModel]] = {
+        "users": [
+            IndexModel([("username", ASCENDING)], unique=True, name="username_unique"),
+            IndexModel([("created_on", DESCENDING), ("_id", DESCENDING)], name="created_on_id"),
+        ],
+        "storyboards": [
+            IndexModel(
+                [("username", ASCENDING), ("created_on", DESCENDING), ("_id", DESCENDING)],
+                name="username_created_on_id",
+            ),
+        ],
+    }
+
+    # Query shapes issued by the routes, checked by explain_query_shapes as (collection, filter, sort)
+    QUERY_SHAPES: List[Tuple[str, Dict, Optional[List[Tuple[str, int]]]]] = [
+        ("users", {"username": ""}, None),
+        ("users", {"username": "", "password": ""}, None),
+        ("users", {"username": {"$ne": ""}}, [("created_on", -1), ("_id", -1)]),
+        ("storyboards", {"username": ""}, [("created_on", -1), ("_id", -1)]),
+    ]
+
     @staticmethod
     def _transform_document(doc: Dict) -> Dict:
         """
@@ -56,13 +137,20 @@ class QueryHelper:
         return [QueryHelper._transform_document(doc) for doc in docs]
 
     @staticmethod
-    def insert_one(collection_name: str, document: Dict) -> Union[Dict, ErrorResponse]:
+    @observed("insert_one")
+    def insert_one(
+        collection_name: str, document: Dict, return_fresh: bool = False
+    ) -> Union[Dict, ErrorResponse]:
         """
         Insert a single document into the collection and return the inserted document.
 
+        The returned document is built from the sent document and the id assigned by the
+        driver, without reading it back.
+
         Args:
             collection_name: Name of the MongoDB collection
             document: Document to insert
+            return_fresh: If True, read the document back from the server instead
 
         Returns:
             The inserted document with '_id' transformed to 'id', or an ErrorResponse
@@ -72,8 +160,18 @@ class QueryHelper:
             document["created_on"] = datetime.datetime.utcnow()
             document["last_updated_on"] = datetime.datetime.utcnow()
             result = QueryHelper.db[collection_name].insert_one(document)
-            doc = QueryHelper.db[collection_name].find_one({"_id": result.inserted_id})
+            query_cache.invalidate_documents(collection_name, [document])
+            if return_fresh:
+                doc = QueryHelper.db[collection_name].find_one({"_id": result.inserted_id})
+            else:
+                doc = {**document, "_id": result.inserted_id}
             return QueryHelper._transform_document(doc)
+        except DuplicateKeyError as e:
+            return ErrorResponse(
+                message=f"Duplicate key in insert_one for collection '{collection_name}': {e}",
+                code=409,
+                errors=[{"detail": str(e)}],
+            )
         except Exception as e:
             return ErrorResponse(
                 message=f"Error in insert_one for collection '{collection_name}': {e}",
@@ -82,6 +180,8 @@ class QueryHelper:
             )
 
     @staticmethod
+    @cached_read("find_one")
+    @observed("find_one")
     def find_one(collection_name: str, query: Dict) -> Union[Dict, ErrorResponse]:
         """
         Find and return a single document matching the query.
@@ -104,22 +204,28 @@ class QueryHelper:
             )
 
     @staticmethod
+    @cached_read("find")
+    @observed("find")
     def find(
         collection_name: str,
         query: Dict,
         skip: int = 0,
         limit: int = 10,
         sort: Optional[List[Tuple[str, int]]] = None,
+        projection: Optional[Dict[str, int]] = None,
     ) -> Union[List[Dict], ErrorResponse]:
         """
         Find multiple documents based on the query with pagination and sorting.
 
+        Prefer find_page for listings: skip cost grows with the page offset.
+
         Args:
             collection_name: Name of the MongoDB collection
             query: Query criteria to match documents
             skip: Number of documents to skip (for pagination)
             limit: Maximum number of documents to return
             sort: List of tuples specifying sort fields and directions (1 for ascending, -1 for descending)
+            projection: Fields to include (1) or exclude (0); all fields if None
 
         Returns:
             List of matching documents with '_id' transformed to 'id', or an ErrorResponse
@@ -132,10 +238,10 @@ class QueryHelper:
 
             docs = list(
                 QueryHelper.db[collection_name]
-                .find(query)
+                .find(query, projection)
+                .sort(sort)
                 .skip(skip)
                 .limit(limit)
-                .sort(sort)
             )
             return QueryHelper._transform_documents(docs)
         except Exception as e:
@@ -146,6 +252,159 @@ class QueryHelper:
             )
 
     @staticmethod
+    @observed("stream")
+    def stream(
+        collection_name: str,
+        query: Dict,
+        batch_size: int = 500,
+        sort: Optional[List[Tuple[str, int]]] = None,
+        projection: Optional[Dict[str, int]] = None,
+    ) -> Iterator[List[Dict]]:
+        """
+        Yield the documents matching the query in batches, without loading them all at once.
+
+        Only one batch is held in memory at a time. Unlike the other methods, errors are raised
+        rather than returned, since a generator cannot return an ErrorResponse after it has
+        started yielding.
+
+        Args:
+            collection_name: Name of the MongoDB collection
+            query: Query criteria to match documents
+            batch_size: Documents fetched per round trip and yielded per batch
+            sort: List of tuples specifying sort fields and directions; natural order if None
+            projection: Fields to include (1) or exclude (0); all fields if None
+
+        Yields:
+            Lists of up to batch_size documents with '_id' transformed to 'id'
+        """
+        cursor = QueryHelper.db[collection_name].find(query, projection, batch_size=batch_size)
+        if sort:
+            cursor = cursor.sort(sort)
+        try:
+            batch = []
+            for doc in cursor:
+                batch.append(QueryHelper._transform_document(doc))
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _encode_cursor(doc: Dict) -> str:
+        """
+        Build an opaque page token from the last document of a page.
+
+        Args:
+            doc: Raw MongoDB document with 'created_on' and '_id'
+
+        Returns:
+            URL-safe token identifying the document's (created_on, _id) position
+        """
+        payload = json.dumps({"c": doc["created_on"].isoformat(), "i": str(doc["_id"])})
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    @staticmethod
+    def _decode_cursor(token: str) -> Tuple[datetime.datetime, ObjectId]:
+        """
+        Decode a page token built by _encode_cursor.
+
+        Args:
+            token: Token returned as 'next_cursor'
+
+        Returns:
+            The (created_on, _id) position the token points at
+
+        Raises:
+            ValueError: If the token is malformed
+        """
+        try:
+            padded = token + "=" * (-len(token) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            return datetime.datetime.fromisoformat(payload["c"]), ObjectId(payload["i"])
+        except Exception as e:
+            raise ValueError(f"Invalid page cursor: {e}")
+
+    @staticmethod
+    @cached_read("find_page")
+    @observed("find_page")
+    def find_page(
+        collection_name: str,
+        query: Dict,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        projection: Optional[Dict[str, int]] = None,
+        direction: int = -1,
+    ) -> Union[Dict, ErrorResponse]:
+        """
+        Find one page of documents ordered by (created_on, _id) using keyset pagination.
+
+        Each page starts right after the position encoded in cursor, so the cost of a page does
+        not depend on how deep into the result set it is.
+
+        Args:
+            collection_name: Name of the MongoDB collection
+            query: Query criteria to match documents
+            limit: Maximum number of documents to return, clamped to 1..MAX_PAGE_SIZE
+            cursor: Token from the previous page's 'next_cursor'; None for the first page
+            projection: Fields to include (1) or exclude (0); all fields if None
+            direction: -1 for newest first, 1 for oldest first
+
+        Returns:
+            Dictionary with 'data' (documents with '_id' transformed to 'id'), 'next_cursor'
+            (None on the last page) and 'has_more', or an ErrorResponse
+        """
+        # Zero would make every page look like it has more, and a negative limit means no limit to MongoDB
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        try:
+            position = QueryHelper._decode_cursor(cursor) if cursor else None
+        except ValueError as e:
+            return ErrorResponse(
+                message=str(e),
+                code=400,
+                errors=[{"detail": str(e)}],
+            )
+
+        try:
+            if position:
+                created_on, last_id = position
+                op = "$lt" if direction < 0 else "$gt"
+                after = {
+                    "$or": [
+                        {"created_on": {op: created_on}},
+                        {"created_on": created_on, "_id": {op: last_id}},
+                    ]
+                }
+                query = {"$and": [query, after]} if query else after
+            if projection and any(projection.values()):
+                # The cursor needs the sort key even if the caller did not ask for it
+                projection = {**projection, "created_on": 1}
+
+            docs = list(
+                QueryHelper.db[collection_name]
+                .find(query, projection)
+                .sort([("created_on", direction), ("_id", direction)])
+                .limit(limit + 1)
+            )
+            has_more = len(docs) > limit
+            docs = docs[:limit]
+            next_cursor = QueryHelper._encode_cursor(docs[-1]) if has_more else None
+            return {
+                "data": QueryHelper._transform_documents(docs),
+                "next_cursor": next_cursor,
+                "has_more": has_more,
+            }
+        except Exception as e:
+            return ErrorResponse(
+                message=f"Error in find_page for collection '{collection_name}': {e}",
+                code=500,
+                errors=[{"detail": str(e)}],
+            )
+
+    @staticmethod
+    @observed("update_one")
     def update_one(
         collection_name: str, query: Dict, update: Dict, upsert: bool = False
     ) -> Union[Dict, ErrorResponse]:
@@ -170,6 +429,7 @@ class QueryHelper:
                 return_document=ReturnDocument.AFTER,
                 upsert=upsert,
             )
+            query_cache.invalidate_query(collection_name, query, update)
             return QueryHelper._transform_document(updated_document)
         except Exception as e:
             return ErrorResponse(
@@ -179,6 +439,7 @@ class QueryHelper:
             )
 
     @staticmethod
+    @observed("delete_one")
     def delete_one(collection_name: str, query: Dict) -> Union[Dict, ErrorResponse]:
         """
         Delete a single document matching the query and return the deletion result.
@@ -192,6 +453,7 @@ class QueryHelper:
         """
         try:
             result = QueryHelper.db[collection_name].delete_one(query)
+            query_cache.invalidate_query(collection_name, query)
             return {"deleted_count": result.deleted_count}
         except Exception as e:
             return ErrorResponse(
@@ -201,6 +463,8 @@ class QueryHelper:
             )
 
     @staticmethod
+    @cached_read("count_documents")
+    @observed("count_documents")
     def count_documents(collection_name: str, query: Dict) -> Union[int, ErrorResponse]:
         """
         Count the number of documents matching the query.
@@ -222,6 +486,7 @@ class QueryHelper:
             )
 
     @staticmethod
+    @observed("aggregate")
     def aggregate(
         collection_name: str, pipeline: List[Dict]
     ) -> Union[List[Dict], ErrorResponse]:
@@ -246,15 +511,24 @@ class QueryHelper:
             )
 
     @staticmethod
+    @observed("bulk_insert")
     def bulk_insert(
-        collection_name: str, documents: List[Dict]
+        collection_name: str,
+        documents: List[Dict],
+        return_fresh: bool = False,
+        ordered: bool = True,
     ) -> Union[List[Dict], ErrorResponse]:
         """
         Insert multiple documents into the collection.
 
+        The returned documents are built from the sent documents and the ids assigned by the
+        driver, in the order they were sent, without reading them back.
+
         Args:
             collection_name: Name of the MongoDB collection
             documents: List of documents to insert
+            return_fresh: If True, read the documents back from the server instead
+            ordered: If False, the server keeps inserting after a failed document
 
         Returns:
             List of inserted documents with '_id' transformed to 'id', or an ErrorResponse
@@ -264,12 +538,22 @@ class QueryHelper:
             for doc in documents:
                 doc["created_on"] = current_time
                 doc["last_updated_on"] = datetime.datetime.utcnow()
-            result = QueryHelper.db[collection_name].insert_many(documents)
-            docs = list(
-                QueryHelper.db[collection_name].find(
-                    {"_id": {"$in": result.inserted_ids}}
+            try:
+                result = QueryHelper.db[collection_name].insert_many(documents, ordered=ordered)
+            finally:
+                # Some documents may have been inserted even if the batch failed
+                query_cache.invalidate_documents(collection_name, documents)
+            if return_fresh:
+                docs = list(
+                    QueryHelper.db[collection_name].find(
+                        {"_id": {"$in": result.inserted_ids}}
+                    )
                 )
-            )
+            else:
+                docs = [
+                    {**doc, "_id": inserted_id}
+                    for doc, inserted_id in zip(documents, result.inserted_ids)
+                ]
             return QueryHelper._transform_documents(docs)
         except Exception as e:
             return ErrorResponse(
@@ -279,25 +563,40 @@ class QueryHelper:
             )
 
     @staticmethod
+    @observed("update_many")
     def update_many(
-        collection_name: str, query: Dict, update: Dict
-    ) -> Union[List[Dict], ErrorResponse]:
+        collection_name: str, query: Dict, update: Dict, return_fresh: bool = False
+    ) -> Union[Dict, List[Dict], ErrorResponse]:
         """
-        Update multiple documents matching the query and return the updated documents.
+        Update multiple documents matching the query.
 
         Args:
             collection_name: Name of the MongoDB collection
             query: Query criteria to match documents to update
             update: Update operations to apply
+            return_fresh: If True, read the updated documents back from the server instead
 
         Returns:
-            List of updated documents with '_id' transformed to 'id', or an ErrorResponse
+            Dictionary with matched and modified counts, the updated documents with '_id'
+            transformed to 'id' if return_fresh, or an ErrorResponse
         """
         try:
             update["last_updated_on"] = datetime.datetime.utcnow()
-            QueryHelper.db[collection_name].update_many(query, {"$set": update})
-            docs = list(QueryHelper.db[collection_name].find(query))
-            return QueryHelper._transform_documents(docs)
+            collection = QueryHelper.db[collection_name]
+            if return_fresh:
+                # The update may change fields the query filters on, so the documents are
+                # read back by id rather than by re-running the query
+                ids = [doc["_id"] for doc in collection.find(query, {"_id": 1})]
+                collection.update_many({"_id": {"$in": ids}}, {"$set": update})
+                query_cache.invalidate_query(collection_name, query, update)
+                docs = list(collection.find({"_id": {"$in": ids}}))
+                return QueryHelper._transform_documents(docs)
+            result = collection.update_many(query, {"$set": update})
+            query_cache.invalidate_query(collection_name, query, update)
+            return {
+                "matched_count": result.matched_count,
+                "modified_count": result.modified_count,
+            }
         except Exception as e:
             return ErrorResponse(
                 message=f"Error in update_many for collection '{collection_name}': {e}",
@@ -306,6 +605,7 @@ class QueryHelper:
             )
 
     @staticmethod
+    @observed("delete_many")
     def delete_many(collection_name: str, query: Dict) -> Union[Dict, ErrorResponse]:
         """
         Delete multiple documents matching the query and return the deletion result.
@@ -319,6 +619,7 @@ class QueryHelper:
         """
         try:
             result = QueryHelper.db[collection_name].delete_many(query)
+            query_cache.invalidate_query(collection_name, query)
             return {"deleted_count": result.deleted_count}
         except Exception as e:
             return ErrorResponse(
@@ -327,6 +628,89 @@ class QueryHelper:
                 errors=[{"detail": str(e)}],
             )
 
+    @staticmethod
+    @observed("bulk_write")
+    def bulk_write(
+        collection_name: str, operations: List[Dict], ordered: bool = True
+    ) -> Union[Dict, ErrorResponse]:
+        """
+        Send a batch of writes to the collection in a single round trip.
+
+        Each operation is a single-key dictionary:
+            {"insert_one": document}
+            {"update_one": {"filter": query, "update": fields, "upsert": False}}
+            {"update_many": {"filter": query, "update": fields}}
+            {"delete_one": {"filter": query}}
+            {"delete_many": {"filter": query}}
+        Updates set the given fields, like update_one and update_many, and timestamps are
+        added the same way as the single-document methods.
+
+        Args:
+            collection_name: Name of the MongoDB collection
+            operations: Write operations, applied in order
+            ordered: If False, the server keeps going after a failed operation
+
+        Returns:
+            Dictionary with inserted, matched, modified, deleted and upserted counts and the
+            inserted ids as strings, or an ErrorResponse
+        """
+        try:
+            now = datetime.datetime.utcnow()
+            requests = []
+            inserted = []
+            for operation in operations:
+                (kind, spec), = operation.items()
+                if kind == "insert_one":
+                    spec["created_on"] = now
+                    spec["last_updated_on"] = now
+                    inserted.append(spec)
+                    requests.append(InsertOne(spec))
+                elif kind in ("update_one", "update_many"):
+                    fields = {**spec["update"], "last_updated_on": now}
+                    request_type = UpdateOne if kind == "update_one" else UpdateMany
+                    requests.append(
+                        request_type(spec["filter"], {"$set": fields}, upsert=spec.get("upsert", False))
+                    )
+                elif kind in ("delete_one", "delete_many"):
+                    request_type = DeleteOne if kind == "delete_one" else DeleteMany
+                    requests.append(request_type(spec["filter"]))
+                else:
+                    raise ValueError(f"Unknown bulk operation '{kind}'")
+
+            try:
+                result = QueryHelper.db[collection_name].bulk_write(requests, ordered=ordered)
+            finally:
+                # Some operations may have been applied even if the batch failed
+                query_cache.invalidate_documents(collection_name, inserted)
+                for operation in operations:
+                    (kind, spec), = operation.items()
+                    if kind != "insert_one":
+                        query_cache.invalidate_query(collection_name, spec["filter"], spec.get("update"))
+
+            return {
+                "inserted_count": result.inserted_count,
+                "matched_count": result.matched_count,
+                "modified_count": result.modified_count,
+                "deleted_count": result.deleted_count,
+                "upserted_count": result.upserted_count,
+                "inserted_ids": [str(doc["_id"]) for doc in inserted if "_id" in doc],
+            }
+        except BulkWriteError as e:
+            return ErrorResponse(
+                message=f"Error in bulk_write for collection '{collection_name}': {e}",
+                code=500,
+                errors=[
+                    {"detail": error.get("errmsg"), "index": error.get("index")}
+                    for error in e.details.get("writeErrors", [])
+                ] or [{"detail": str(e)}],
+            )
+        except Exception as e:
+            return ErrorResponse(
+                message=f"Error in bulk_write for collection '{collection_name}': {e}",
+                code=500,
+                errors=[{"detail": str(e)}],
+            )
+
     @staticmethod
     def get_object_id(id: str) -> Union[ObjectId, ErrorResponse]:
         """
@@ -362,4 +746,87 @@ class QueryHelper:
                 errors=[{"detail": str(e)}],
             )
 
-    
\ No newline at end of file
+    @staticmethod
+    @observed("ensure_indexes", collection="*")
+    def ensure_indexes() -> Union[Dict[str, List[str]], ErrorResponse]:
+        """
+        Create the indexes declared in INDEXES. Existing indexes are left untouched.
+
+        Returns:
+            Dictionary of collection name to created index names, or an ErrorResponse
+        """
+        try:
+            return {
+                collection_name: QueryHelper.db[collection_name].create_indexes(indexes)
+                for collection_name, indexes in QueryHelper.INDEXES.items()
+            }
+        except Exception as e:
+            return ErrorResponse(
+                message=f"Error in ensure_indexes: {e}",
+                code=500,
+                errors=[{"detail": str(e)}],
+            )
+
+    @staticmethod
+    def _plan_stages(plan: Dict) -> List[str]:
+        """
+        Collect the stage names of a query plan, outermost first.
+
+        Args:
+            plan: A winningPlan document from explain
+
+        Returns:
+            List of stage names such as FETCH, IXSCAN or COLLSCAN
+        """
+        stages = [plan["stage"]] if "stage" in plan else []
+        children = list(plan.get("inputStages", []))
+        for key in ("inputStage", "queryPlan"):
+            if key in plan:
+                children.append(plan[key])
+        for child in children:
+            stages.extend(QueryHelper._plan_stages(child))
+        return stages
+
+    @staticmethod
+    @observed("explain_query_shapes", collection="*")
+    def explain_query_shapes() -> Union[List[Dict[str, Any]], ErrorResponse]:
+        """
+        Run explain on every registered query shape and flag collection scans.
+
+        Returns:
+            One report per shape with its winning plan stages and a 'collscan' flag, or an ErrorResponse
+        """
+        try:
+            reports = []
+            for collection_name, query, sort in QueryHelper.QUERY_SHAPES:
+                cursor = QueryHelper.db[collection_name].find(query)
+                if sort:
+                    cursor = cursor.sort(sort)
+                plan = cursor.explain()["queryPlanner"]["winningPlan"]
+                stages = QueryHelper._plan_stages(plan)
+                reports.append(
+                    {
+                        "collection": collection_name,
+                        "filter": sorted(query),
+                        "sort": sort,
+                        "stages": stages,
+                        "collscan": "COLLSCAN" in stages,
+                    }
+                )
+            return reports
+        except Exception as e:
+            return ErrorResponse(
+                message=f"Error in explain_query_shapes: {e}",
+                code=500,
+                errors=[{"detail": str(e)}],
+            )
+
+    @staticmethod
+    def cache_stats() -> Dict[str, Dict[str, Any]]:
+        """
+        Report the read cache's effectiveness.
+
+        Returns:
+            Per-collection hits, misses, invalidations, evictions, entries and hit ratio
+        """
+        return query_cache.stats()
@@ -0,0 +1,51 @@
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Tuple
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into a single execution.
+
+    The first caller for a key runs the function; callers arriving while it is
+    still running wait for it and receive the same result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+
+    def do(self, key: str, fn: Callable[..., Any], *args, **kwargs) -> Tuple[Any, bool]:
+        """
+        Run fn once per in-flight key.
+
+        Args:
+            key: Identity of the work being done
+            fn: Function to run if no call for key is in flight
+            *args, **kwargs: Arguments passed to fn
+
+        Returns:
+            Tuple of (result, shared) where shared is True if the result came
+            from another caller's execution
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return result, False